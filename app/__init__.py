@@ -1,19 +1,71 @@
 import os
+import sqlite3
+from threading import Lock
 
 from flask import Flask
 from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 from app.config import config
 
-app = Flask(__name__)
-CORS(app, origins="*", supports_credentials=True)
-config_name = os.getenv("FLASK_CONFIG") or "default"
-app.config.from_object(config[config_name])
+# Lock preventing concurrent registration of the SQLite WAL listener
+_sqlite_wal_lock = Lock()
 
-db = SQLAlchemy(app)
-Migrate(app, db)
 
-from .models import *
-from .views import *
+class _SQLAlchemy(SQLAlchemy):
+    def get_engine(self, app=None, bind=None):
+        # The engine is created on first use (and re-created if the database URI changes),
+        # therefore the WAL listener is registered on the engine of the application when it is looked up
+        engine = super().get_engine(app, bind)
+        if self.get_app(app).config.get("SQLITE_WAL_ENABLED") and engine.dialect.name == "sqlite":
+            with _sqlite_wal_lock:
+                if not event.contains(engine, "connect", _enable_sqlite_wal):
+                    event.listen(engine, "connect", _enable_sqlite_wal)
+        return engine
+
+
+# Extensions are bound to an application in create_app(),
+# so that no engine or connection is created before the application is instantiated (e.g. in a forked worker)
+db = _SQLAlchemy()
+cors = CORS()
+
+
+def create_app(config_name: str = None, migrations: bool = True) -> Flask:
+    """
+    Application factory
+    :param config_name: Name of the configuration to use (defaults to the FLASK_CONFIG environment variable)
+    :param migrations: Whether database migrations are set up, which are only needed by the "flask db" commands
+        (servers pass False, so that alembic is not imported by every worker)
+    :return: Configured Flask application
+    """
+    app = Flask(__name__)
+    config_name = config_name or os.getenv("FLASK_CONFIG") or "default"
+    app.config.from_object(config[config_name])
+
+    cors.init_app(app, origins="*", supports_credentials=True)
+    db.init_app(app)
+    if migrations:
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
+
+    # Models, views and commands are imported on demand, to keep the import of the package itself lightweight
+    from .models import letter, refresh_run, status_update  # noqa: F401 (registers the models with the metadata)
+    from .views import api
+    from .commands import tracking_cli
+    from .profiling.request_profiler import init_profiling
+    from .tracking_service.upstream_dispatcher import init_upstream_dispatcher
+    app.register_blueprint(api)
+    app.cli.add_command(tracking_cli)
+    init_profiling(app)
+    init_upstream_dispatcher(app)
+    return app
+
+
+def _enable_sqlite_wal(dbapi_connection, _connection_record) -> None:
+    # In WAL mode readers do not block writers, e.g. a long-running export does not lock out tracking updates
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
@@ -0,0 +1,116 @@
+import os
+
+import click
+from flask.cli import AppGroup
+
+from app.tracking_service.letter_export_service import LetterExportService
+from app.tracking_service.letter_import_report_dto import LetterImportReportDto
+from app.tracking_service.letter_import_service import LetterImportService
+from app.utils.timestamp_parser import parse_timestamp
+
+tracking_cli = AppGroup("tracking", help="Letter tracking maintenance commands.")
+
+
+@tracking_cli.command("import")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "input_format", type=click.Choice([LetterImportService.FORMAT_CSV,
+                                                             LetterImportService.FORMAT_JSONL]),
+              help="Input format (guessed from the file extension if omitted).")
+@click.option("--chunk-size", type=click.IntRange(min=1), default=LetterImportService.DEFAULT_CHUNK_SIZE,
+              show_default=True, help="Number of rows inserted per transaction.")
+def import_letters(source, input_format: str, chunk_size: int):
+    """Register tracking numbers in bulk from a CSV or JSONL file ("-" for stdin)."""
+    if not input_format:
+        extension = os.path.splitext(source.name)[1].lower()
+        input_format = LetterImportService.FORMAT_JSONL if extension in (".jsonl", ".ndjson") \
+            else LetterImportService.FORMAT_CSV
+
+    def report_progress(report: LetterImportReportDto):
+        click.echo(f"{report.rows_read} rows read, {report.inserted} inserted, "
+                   f"{report.duplicates} duplicates, {report.rejected_count} rejected", err=True)
+
+    import_service = LetterImportService(chunk_size=chunk_size)
+    report = import_service.import_letters(source, input_format, on_progress=report_progress)
+    for line_number, reason in report.rejected:
+        click.echo(f"Rejected line {line_number}: {reason}", err=True)
+    if report.rejected_count > len(report.rejected):
+        click.echo(f"... and {report.rejected_count - len(report.rejected)} more rejected rows", err=True)
+    click.echo(f"Imported {report.inserted} new letters ({report.duplicates} duplicates, "
+               f"{report.rejected_count} rejected) out of {report.rows_read} rows")
+
+
+@tracking_cli.command("export")
+@click.argument("destination", type=click.File("wb"))
+@click.option("--format", "output_format", type=click.Choice([LetterExportService.FORMAT_JSONL,
+                                                              LetterExportService.FORMAT_CSV]),
+              help="Output format (guessed from the file extension if omitted).")
+@click.option("--gzip", "compress", is_flag=True, default=None,
+              help="Compress the output with gzip (implied by a .gz file extension).")
+@click.option("--from", "from_date", help="Export letters updated from this timestamp.")
+@click.option("--to", "to_date", help="Export letters updated until this timestamp.")
+@click.option("--final/--non-final", default=None, help="Export only final or only non-final letters.")
+def export_letters(destination, output_format: str, compress: bool, from_date: str, to_date: str, final: bool):
+    """Export letters with their status history as JSONL or CSV ("-" for stdout)."""
+    base_name, extension = os.path.splitext(str(getattr(destination, "name", "")).lower())
+    if compress is None:
+        compress = extension == ".gz"
+    if extension == ".gz":
+        extension = os.path.splitext(base_name)[1]
+    if not output_format:
+        output_format = LetterExportService.FORMAT_CSV if extension == ".csv" else LetterExportService.FORMAT_JSONL
+    try:
+        from_update = parse_timestamp(from_date) if from_date else None
+        to_update = parse_timestamp(to_date) if to_date else None
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    export_service = LetterExportService()
+    written = 0
+    for chunk in export_service.export_letters(output_format, compress, from_update, to_update, final):
+        destination.write(chunk)
+        written += len(chunk)
+    click.echo(f"Exported {written} bytes", err=True)
+
+
+@tracking_cli.command("replay-server")
+@click.argument("recording", type=click.Path(exists=True, dir_okay=False))
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8787, show_default=True)
+@click.option("--speed", type=click.FloatRange(min=0), default=1.0, show_default=True,
+              help="Latency divisor, e.g. 2 replays twice as fast as recorded (0 replays without latency).")
+@click.option("--concurrency", type=click.IntRange(min=1), help="Maximum number of requests served at a time.")
+@click.option("--rate-429", type=click.FloatRange(0, 1), default=0.0, show_default=True,
+              help="Fraction of requests answered with 429 Too Many Requests.")
+@click.option("--rate-timeout", type=click.FloatRange(0, 1), default=0.0, show_default=True,
+              help="Fraction of requests never answered.")
+@click.option("--rate-slow-body", type=click.FloatRange(0, 1), default=0.0, show_default=True,
+              help="Fraction of requests whose body is sent slowly.")
+@click.option("--timeout-seconds", type=click.FloatRange(min=0), default=30.0, show_default=True,
+              help="Time before the connection of an unanswered request is closed.")
+@click.option("--slow-body-seconds", type=click.FloatRange(min=0), default=5.0, show_default=True,
+              help="Time taken to send a slow body.")
+@click.option("--cycle-unknown", is_flag=True,
+              help="Answer unknown shipment ids with recorded responses of other shipments instead of 404.")
+@click.option("--seed", type=int, help="Seed of fault injection, for reproducible runs.")
+def replay_server(recording: str, host: str, port: int, speed: float, concurrency: int,
+                  rate_429: float, rate_timeout: float, rate_slow_body: float,
+                  timeout_seconds: float, slow_body_seconds: float, cycle_unknown: bool, seed: int):
+    """Serve recorded La Poste API responses (see LA_POSTE_RECORD_PATH) for offline load testing."""
+    # Imported on first use, since the HTTP server is only needed by this command
+    from app.la_poste_replay.replay_server import FaultInjection, ReplayServer
+    from app.la_poste_replay.response_recorder import load_recording
+
+    try:
+        faults = FaultInjection(rate_429, rate_timeout, rate_slow_body, timeout_seconds, slow_body_seconds)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    responses = load_recording(recording)
+    server = ReplayServer((host, port), responses, speed=speed, concurrency=concurrency, faults=faults,
+                          cycle_unknown=cycle_unknown, seed=seed)
+    click.echo(f"Replaying {sum(len(recorded) for recorded in responses.values())} responses "
+               f"of {len(responses)} shipments on http://{host}:{port}", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -4,18 +4,39 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = "sqlite:///la_poste_nicpoyia.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite write-ahead logging, so that long reads (e.g. exports) do not block writers.
+    # Disabled by default, since WAL does not work on network filesystems and permanently converts the database file
+    SQLITE_WAL_ENABLED = os.environ.get('SQLITE_WAL_ENABLED', '').lower() in ('1', 'true', 'yes')
+    # Request profiling (disabled by default, in which case no profiling hook is registered)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    # Requests carrying this header with a true value (e.g. "X-Profile: 1") are profiled
+    PROFILING_HEADER = "X-Profile"
+    # Fraction of requests profiled without the header
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+    # Directory where profile files (cProfile/pstats format) are saved
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', 'profiles')
+    # Optional file where every response of La Poste API is recorded, to be replayed by the replay server
+    LA_POSTE_RECORD_PATH = os.environ.get('LA_POSTE_RECORD_PATH')
+    # Maximum number of concurrent calls to La Poste API (per process)
+    UPSTREAM_MAX_CONCURRENCY = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 8))
+    # Number of concurrent calls reserved for interactive lookups, i.e. never used by background refresh
+    UPSTREAM_INTERACTIVE_RESERVED = int(os.environ.get('UPSTREAM_INTERACTIVE_RESERVED', 2))
+    # Optional maximum number of calls to La Poste API per second (per process)
+    UPSTREAM_RATE_LIMIT = float(os.environ['UPSTREAM_RATE_LIMIT']) if os.environ.get('UPSTREAM_RATE_LIMIT') else None
+    # Fraction of the rate limit reserved for interactive lookups
+    UPSTREAM_INTERACTIVE_RESERVED_QUOTA = float(os.environ.get('UPSTREAM_INTERACTIVE_RESERVED_QUOTA', 0.2))
 
 
 class DevelopmentConfig(Config):
     ENV_TYPE = "development"
-    LA_POSTE_API_BASE_URL = "https://api.laposte.fr/ssu/v1"
+    LA_POSTE_API_BASE_URL = os.environ.get('LA_POSTE_API_BASE_URL', "https://api.laposte.fr/ssu/v1")
     LA_POSTE_API_KEY = os.environ.get('LA_POSTE_API_KEY')
     APP_DEBUG = True
 
 
 class ProductionConfig(Config):
     ENV_TYPE = "production"
-    LA_POSTE_API_BASE_URL = "https://api.laposte.fr/ssu/v1"
+    LA_POSTE_API_BASE_URL = os.environ.get('LA_POSTE_API_BASE_URL', "https://api.laposte.fr/ssu/v1")
     LA_POSTE_API_KEY = os.environ.get('LA_POSTE_API_KEY')
 
 
@@ -0,0 +1 @@
+__all__ = ["response_recorder", "replay_server"]
@@ -0,0 +1,197 @@
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import BoundedSemaphore, Lock, Thread
+from typing import Dict, List, Optional
+
+from .response_recorder import KEY_BODY, KEY_CONTENT_TYPE, KEY_LATENCY_MS, KEY_STATUS_CODE
+
+# Path of the tracking endpoint (any prefix is accepted, so that the base URL of the real API can be mirrored)
+_TRACKING_PATH = re.compile(r"/suivi-unifie/idship/([^/?]+)")
+
+
+class FaultInjection:
+    # Fraction of requests answered with "429 Too Many Requests"
+    rate_429: float
+    # Fraction of requests that are never answered (the connection is closed after timeout_seconds)
+    rate_timeout: float
+    # Fraction of requests whose body is sent slowly, over slow_body_seconds
+    rate_slow_body: float
+    # Time waited before closing the connection of a timed-out request
+    timeout_seconds: float
+    # Time taken to send a slow body
+    slow_body_seconds: float
+
+    def __init__(self,
+                 rate_429: float = 0.0,
+                 rate_timeout: float = 0.0,
+                 rate_slow_body: float = 0.0,
+                 timeout_seconds: float = 30.0,
+                 slow_body_seconds: float = 5.0) -> None:
+        super().__init__()
+        if rate_429 < 0 or rate_timeout < 0 or rate_slow_body < 0 or rate_429 + rate_timeout + rate_slow_body > 1:
+            raise ValueError("Fault rates must be non-negative and add up to at most 1")
+        self.rate_429 = rate_429
+        self.rate_timeout = rate_timeout
+        self.rate_slow_body = rate_slow_body
+        self.timeout_seconds = timeout_seconds
+        self.slow_body_seconds = slow_body_seconds
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Stand-in of the tracking API, serving back recorded responses with their recorded latency
+    """
+    daemon_threads = True
+
+    # Recorded responses per shipment id
+    responses: Dict[str, List[dict]]
+    # Latency divisor, e.g. 2.0 replays twice as fast as recorded (0 replays without any latency)
+    speed: float
+    # Whether unknown shipment ids are answered with recorded responses of other shipments (instead of 404)
+    cycle_unknown: bool
+    # Faults injected in the responses
+    faults: FaultInjection
+
+    def __init__(self,
+                 server_address: tuple,
+                 responses: Dict[str, List[dict]],
+                 speed: float = 1.0,
+                 concurrency: Optional[int] = None,
+                 faults: FaultInjection = None,
+                 cycle_unknown: bool = False,
+                 seed: Optional[int] = None) -> None:
+        """
+        :param server_address: Host and port to listen to
+        :param responses: Recorded responses per shipment id
+        :param speed: Latency divisor, e.g. 2.0 replays twice as fast as recorded (0 replays without any latency)
+        :param concurrency: Optional maximum number of requests served at the same time (others are queued)
+        :param faults: Optional faults to inject in the responses
+        :param cycle_unknown: Whether unknown shipment ids are answered with recorded responses of other shipments
+        :param seed: Optional seed of fault injection, for reproducible runs
+        """
+        super().__init__(server_address, _ReplayRequestHandler)
+        self.responses = responses
+        self.speed = speed
+        self.cycle_unknown = cycle_unknown
+        self.faults = faults or FaultInjection()
+        self.__all_responses = [response for recorded in responses.values() for response in recorded]
+        self.__next_index = {}
+        self.__unknown_counter = count()
+        self.__random = random.Random(seed)
+        self.__lock = Lock()
+        self.__slots = BoundedSemaphore(concurrency) if concurrency else None
+
+    def start_in_background(self) -> Thread:
+        """
+        :return: Started thread serving requests until shutdown() is called
+        """
+        thread = Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def acquire_slot(self) -> None:
+        if self.__slots:
+            self.__slots.acquire()
+
+    def release_slot(self) -> None:
+        if self.__slots:
+            self.__slots.release()
+
+    def next_response(self, shipment_id: str) -> Optional[dict]:
+        """
+        :param shipment_id: Requested shipment id
+        :return: Next recorded response of the shipment (in round robin), or None if there is none
+        """
+        with self.__lock:
+            recorded = self.responses.get(shipment_id)
+            if recorded:
+                index = self.__next_index.get(shipment_id, 0)
+                self.__next_index[shipment_id] = index + 1
+                return recorded[index % len(recorded)]
+            if self.cycle_unknown and self.__all_responses:
+                return self.__all_responses[next(self.__unknown_counter) % len(self.__all_responses)]
+        return None
+
+    def draw_fault(self) -> Optional[str]:
+        """
+        :return: Fault to inject in the next response ("429", "timeout", "slow_body"), or None
+        """
+        with self.__lock:
+            draw = self.__random.random()
+        if draw < self.faults.rate_429:
+            return "429"
+        draw -= self.faults.rate_429
+        if draw < self.faults.rate_timeout:
+            return "timeout"
+        draw -= self.faults.rate_timeout
+        if draw < self.faults.rate_slow_body:
+            return "slow_body"
+        return None
+
+
+class _ReplayRequestHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        match = _TRACKING_PATH.search(self.path)
+        if not match:
+            self.__send(404, "application/json", json.dumps({"returnCode": 404, "returnMessage": "Not found"}))
+            return
+        self.server.acquire_slot()
+        try:
+            self.__replay(match.group(1))
+        finally:
+            self.server.release_slot()
+
+    def __replay(self, shipment_id: str):
+        fault = self.server.draw_fault()
+        if fault == "timeout":
+            time.sleep(self.server.faults.timeout_seconds)
+            self.close_connection = True
+            return
+        if fault == "429":
+            self.__send(429, "application/json",
+                        json.dumps({"code": "TOO_MANY_REQUESTS", "message": "Too many requests"}),
+                        extra_headers={"Retry-After": "1"})
+            return
+        response = self.server.next_response(shipment_id)
+        if response is None:
+            self.__send(404, "application/json", json.dumps({
+                "returnCode": 104,
+                "returnMessage": f"Shipment {shipment_id} is not in the recording",
+            }))
+            return
+        if self.server.speed > 0:
+            time.sleep(response[KEY_LATENCY_MS] / 1000 / self.server.speed)
+        self.__send(response[KEY_STATUS_CODE],
+                    response.get(KEY_CONTENT_TYPE) or "application/json",
+                    response[KEY_BODY],
+                    slow=fault == "slow_body")
+
+    def __send(self, status_code: int, content_type: str, body: str, slow: bool = False, extra_headers: dict = None):
+        payload = body.encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not slow:
+            self.wfile.write(payload)
+            return
+        # Trickle the body in a few pieces over the configured time
+        pieces = 10
+        piece_size = max(1, -(-len(payload) // pieces))
+        for offset in range(0, len(payload), piece_size):
+            self.wfile.write(payload[offset:offset + piece_size])
+            self.wfile.flush()
+            time.sleep(self.server.faults.slow_body_seconds / pieces)
+
+    def log_message(self, format, *args):
+        # Request logging would dominate the cost of replaying under load
+        pass
@@ -0,0 +1,66 @@
+import gzip
+import json
+from threading import Lock
+from typing import Dict, Iterator, List
+
+# Keys of a recorded response (kept short, since recordings may contain millions of responses)
+KEY_SHIPMENT_ID = "id"
+KEY_STATUS_CODE = "st"
+KEY_LATENCY_MS = "ms"
+KEY_CONTENT_TYPE = "ct"
+KEY_BODY = "b"
+
+# Lock shared by all recorders of the process, since a recorder is created per tracking service (i.e. per request)
+_recording_lock = Lock()
+
+
+class ResponseRecorder:
+    # Path of the recording file (JSON lines, one response per line)
+    path: str
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+
+    def record(self, shipment_id: str, status_code: int, latency_seconds: float, content_type: str, body: str) -> None:
+        """
+        Appends a response of the tracking API to the recording
+        :param shipment_id: Shipment id of the tracked letter
+        :param status_code: HTTP status code of the response
+        :param latency_seconds: Time until the response was received
+        :param content_type: Content type of the response
+        :param body: Body of the response
+        """
+        line = json.dumps({
+            KEY_SHIPMENT_ID: shipment_id,
+            KEY_STATUS_CODE: status_code,
+            KEY_LATENCY_MS: round(latency_seconds * 1000, 1),
+            KEY_CONTENT_TYPE: content_type,
+            KEY_BODY: body,
+        }, separators=(',', ':'), ensure_ascii=False)
+        # Every line is written with a single unbuffered append, so that several workers can record to the same file
+        with _recording_lock, open(self.path, "ab", buffering=0) as recording:
+            recording.write((line + "\n").encode("utf-8"))
+
+
+def read_recording(path: str) -> Iterator[dict]:
+    """
+    :param path: Path of a recording file (optionally gzip-compressed, with a .gz extension)
+    :return: Generator of recorded responses
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as recording:
+        for line in recording:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_recording(path: str) -> Dict[str, List[dict]]:
+    """
+    :param path: Path of a recording file (optionally gzip-compressed, with a .gz extension)
+    :return: Recorded responses per shipment id, in recording order
+    """
+    responses = {}
+    for response in read_recording(path):
+        responses.setdefault(response[KEY_SHIPMENT_ID], []).append(response)
+    return responses
@@ -1 +1 @@
-__all__ = ["letter", "status_update"]
+__all__ = ["letter", "status_update", "refresh_run"]
@@ -0,0 +1,43 @@
+from sqlalchemy.sql import func
+
+from app import db
+
+
+class RefreshRun(db.Model):
+    __tablename__ = "refresh_run"
+
+    id = db.Column(db.Integer, primary_key=True)
+    started = db.Column(db.DateTime(timezone=True), server_default=func.now(), index=True)
+    finished = db.Column(db.DateTime(timezone=True), nullable=True)
+    from_update = db.Column(db.DateTime(timezone=True), nullable=True)
+    to_update = db.Column(db.DateTime(timezone=True), nullable=True)
+    letters_attempted = db.Column(db.Integer, default=0)
+    letters_changed = db.Column(db.Integer, default=0)
+    letters_unchanged = db.Column(db.Integer, default=0)
+    letters_failed = db.Column(db.Integer, default=0)
+    upstream_seconds = db.Column(db.Float, default=0.0)
+    db_seconds = db.Column(db.Float, default=0.0)
+    letters_per_second = db.Column(db.Float, nullable=True)
+    error = db.Column(db.String(191), nullable=True)
+
+    def is_finished(self) -> bool:
+        return self.finished is not None
+
+    def finish(self,
+               attempted: int,
+               changed: int,
+               unchanged: int,
+               failed: int,
+               upstream_seconds: float,
+               db_seconds: float,
+               elapsed_seconds: float,
+               error: str = None) -> None:
+        self.finished = func.now()
+        self.letters_attempted = attempted
+        self.letters_changed = changed
+        self.letters_unchanged = unchanged
+        self.letters_failed = failed
+        self.upstream_seconds = upstream_seconds
+        self.db_seconds = db_seconds
+        self.letters_per_second = attempted / elapsed_seconds if elapsed_seconds > 0 else None
+        self.error = error[:191] if error else None
@@ -0,0 +1,255 @@
+import functools
+import logging
+import os
+import random
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Optional
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+
+# Categories of time reported in the Server-Timing header
+UPSTREAM = "upstream"
+DB = "db"
+SERIALISATION = "serialisation"
+
+# Profile of the request (or background refresh) running in the current thread, if it is being profiled
+_active_profile = ContextVar("active_profile", default=None)
+# Lock preventing concurrent registration of the database timing listeners
+_db_listeners_lock = Lock()
+
+
+class RequestProfile:
+    # Name of the profile, used in the name of the saved profile file
+    name: str
+    # Directory where the profile file is saved
+    output_dir: str
+    # Accumulated seconds per category
+    timings: dict
+    # Start of the profiled run (perf_counter)
+    started: float
+    # End of the view function (perf_counter), i.e. start of the serialisation of the response
+    view_finished: Optional[float]
+
+    def __init__(self, name: str, output_dir: str) -> None:
+        super().__init__()
+        self.name = name
+        self.output_dir = output_dir
+        self.timings = {UPSTREAM: 0.0, DB: 0.0, SERIALISATION: 0.0}
+        self.started = perf_counter()
+        self.view_finished = None
+        self.__profiler = None
+        self.__db_section_depth = 0
+
+    def add(self, category: str, seconds: float) -> None:
+        self.timings[category] = self.timings.get(category, 0.0) + seconds
+
+    def is_in_db_section(self) -> bool:
+        return self.__db_section_depth > 0
+
+    def enter_section(self, category: str) -> None:
+        if category == DB:
+            self.__db_section_depth += 1
+
+    def exit_section(self, category: str) -> None:
+        if category == DB:
+            self.__db_section_depth -= 1
+
+    def start_profiler(self) -> None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on some Python versions (e.g. concurrent requests)
+            logging.warning(f"Cannot profile \"{self.name}\" while another profiler is active")
+            return
+        self.__profiler = profiler
+
+    def stop_profiler(self) -> Optional[str]:
+        """
+        Stops the profiler and saves the collected profile
+        :return: Path of the saved profile file (None if nothing was profiled)
+        """
+        if not self.__profiler:
+            return None
+        self.__profiler.disable()
+        os.makedirs(self.output_dir, exist_ok=True)
+        file_name = "{ts}-{name}-{uid}.prof".format(
+            ts=datetime.utcnow().strftime("%Y%m%dT%H%M%S"),
+            name=re.sub(r"[^A-Za-z0-9_.-]+", "_", self.name).strip("_"),
+            uid=uuid.uuid4().hex[:8]
+        )
+        path = os.path.join(self.output_dir, file_name)
+        self.__profiler.dump_stats(path)
+        self.__profiler = None
+        return path
+
+    def server_timing(self, finished: float) -> str:
+        """
+        :param finished: End of the profiled run (perf_counter)
+        :return: Value of the Server-Timing header
+        """
+        total = finished - self.started
+        if self.view_finished is not None:
+            self.timings[SERIALISATION] = finished - self.view_finished
+        metrics = [f"{category};dur={seconds * 1000:.1f}" for category, seconds in self.timings.items()]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+class _TimedSection:
+    __slots__ = ("category", "profile", "started")
+
+    def __init__(self, category: str, profile: RequestProfile) -> None:
+        self.category = category
+        self.profile = profile
+        self.started = 0.0
+
+    def __enter__(self):
+        self.profile.enter_section(self.category)
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profile.add(self.category, perf_counter() - self.started)
+        self.profile.exit_section(self.category)
+
+
+class _NoopSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+_NOOP_SECTION = _NoopSection()
+
+
+def timed(category: str):
+    """
+    :param category: Category the time of the section is accounted to (e.g. UPSTREAM)
+    :return: Context manager timing the section if the current run is profiled, or a shared no-op otherwise
+    """
+    profile = _active_profile.get()
+    if profile is None:
+        return _NOOP_SECTION
+    return _TimedSection(category, profile)
+
+
+def profiled_background_task(name: str, target: Callable) -> Callable:
+    """
+    :param name: Name of the background task, used in the name of the saved profile file
+    :param target: Background task started by the current run
+    :return: The task itself if the current run is not profiled, otherwise a wrapper profiling the task separately
+    """
+    parent_profile = _active_profile.get()
+    if parent_profile is None:
+        return target
+
+    def run_profiled(*args, **kwargs):
+        profile = RequestProfile(f"{parent_profile.name}-{name}", parent_profile.output_dir)
+        token = _active_profile.set(profile)
+        profile.start_profiler()
+        try:
+            return target(*args, **kwargs)
+        finally:
+            path = profile.stop_profiler()
+            _active_profile.reset(token)
+            logging.info(f"Profiled background task \"{profile.name}\": {profile.server_timing(perf_counter())}"
+                         + (f" (saved to {path})" if path else ""))
+
+    return run_profiled
+
+
+def init_profiling(app: Flask) -> None:
+    """
+    Registers the request profiling hooks, if profiling is enabled in the configuration of the application.
+    When it is disabled, nothing is registered, so that requests are not affected at all.
+    A request is profiled if it carries the configured header, or if it is sampled at the configured rate.
+    :param app: Application with its views already registered
+    """
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+    header = app.config.get("PROFILING_HEADER")
+    sample_rate = app.config.get("PROFILING_SAMPLE_RATE") or 0.0
+    output_dir = app.config.get("PROFILING_DIR")
+
+    # Mark the end of every view function, so that the remaining time until the response is sent is serialisation
+    for endpoint, view_function in list(app.view_functions.items()):
+        app.view_functions[endpoint] = _mark_view_finished(view_function)
+
+    @app.before_request
+    def start_request_profile():
+        header_value = request.headers.get(header, "") if header else ""
+        if header_value.lower() not in ("1", "true", "yes") and (sample_rate <= 0 or random.random() >= sample_rate):
+            return
+        _register_db_listeners(db.engine)
+        profile = RequestProfile(f"{request.method}-{request.path}", output_dir)
+        g.request_profile = profile
+        g.request_profile_token = _active_profile.set(profile)
+        profile.start_profiler()
+
+    @app.after_request
+    def add_server_timing(response: Response):
+        profile = g.get("request_profile")
+        if profile:
+            response.headers["Server-Timing"] = profile.server_timing(perf_counter())
+        return response
+
+    @app.teardown_request
+    def finish_request_profile(_exception):
+        profile = g.pop("request_profile", None)
+        if profile:
+            profile.stop_profiler()
+            _active_profile.reset(g.pop("request_profile_token"))
+
+
+def _mark_view_finished(view_function: Callable) -> Callable:
+    @functools.wraps(view_function)
+    def profiled_view(*args, **kwargs):
+        response = view_function(*args, **kwargs)
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.view_finished = perf_counter()
+        return response
+
+    return profiled_view
+
+
+def _register_db_listeners(engine: Engine) -> None:
+    # Time spent in every statement execution is accounted to the DB category,
+    # unless it is already included in an explicitly timed DB section.
+    # The listeners are registered on the engine of the application only, on the first profiled request
+    with _db_listeners_lock:
+        if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            return
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profile.get() is not None:
+        conn.info.setdefault("profiling_query_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    starts = conn.info.get("profiling_query_start")
+    if profile is None or not starts:
+        return
+    elapsed = perf_counter() - starts.pop()
+    if not profile.is_in_db_section():
+        profile.add(DB, elapsed)
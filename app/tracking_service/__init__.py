@@ -1 +1,8 @@
-__all__ = ["tracking_service", "tracking_response_dto", "tracking_exception"]
+__all__ = [
+    "tracking_service",
+    "tracking_response_dto",
+    "tracking_exception",
+    "letter_import_service",
+    "letter_import_report_dto",
+    "letter_export_service",
+]
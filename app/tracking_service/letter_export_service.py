@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.letter import Letter
+from app.models.status_update import StatusUpdate
+
+
+class LetterExportService:
+    # Number of rows fetched from the database cursor at a time
+    __FETCH_SIZE = 2000
+    # Approximate size of each produced chunk before it is handed over to the writer
+    __CHUNK_BYTES = 64 * 1024
+    # Columns of every exported row (one row per status update, or one per letter without history)
+    COLUMNS = [
+        "letter_id",
+        "tracking_number",
+        "status",
+        "final",
+        "updated",
+        "status_update_id",
+        "status_update_status",
+        "status_update_timestamp",
+    ]
+    # Supported output formats
+    FORMAT_CSV = "csv"
+    FORMAT_JSONL = "jsonl"
+
+    # Active database session
+    db_session: Session
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.db_session = db.session
+
+    def export_letters(self,
+                       output_format: str,
+                       compress: bool = False,
+                       from_update: datetime = None,
+                       to_update: datetime = None,
+                       final: Optional[bool] = None) -> Iterator[bytes]:
+        """
+        Exports letters joined with their status history as a stream of encoded chunks,
+        reading the database through a streaming cursor so that memory usage does not depend on the export size
+        :param output_format: Format of the export ("csv" or "jsonl")
+        :param compress: Whether the produced stream is gzip-compressed
+        :param from_update: Optional update timestamp to filter letters from
+        :param to_update: Optional update timestamp to filter letters until
+        :param final: Optional finality to filter letters by
+        :return: Generator of encoded (and optionally compressed) chunks
+        :raises:
+            ValueError: In case of unsupported output format
+        """
+        if output_format not in (self.FORMAT_CSV, self.FORMAT_JSONL):
+            raise ValueError(f"Unsupported export format \"{output_format}\"")
+        chunks = self.__encode_rows(output_format, from_update, to_update, final)
+        if compress:
+            chunks = self.__gzip(chunks)
+        return chunks
+
+    def __query_rows(self, from_update: datetime, to_update: datetime, final: Optional[bool]):
+        query = self.db_session.query(
+            Letter.id,
+            Letter.tracking_number,
+            Letter.status,
+            Letter.final,
+            Letter.updated,
+            StatusUpdate.id,
+            StatusUpdate.status,
+            StatusUpdate.timestamp_tracked,
+        ).outerjoin(StatusUpdate, StatusUpdate.letter_id == Letter.id)
+        if from_update:
+            query = query.filter(Letter.updated >= from_update)
+        if to_update:
+            query = query.filter(Letter.updated <= to_update)
+        if final is not None:
+            query = query.filter(Letter.final == final)
+        return query.order_by(Letter.id.asc(), StatusUpdate.id.asc()) \
+            .execution_options(stream_results=True) \
+            .yield_per(self.__FETCH_SIZE)
+
+    def __encode_rows(self,
+                      output_format: str,
+                      from_update: datetime,
+                      to_update: datetime,
+                      final: Optional[bool]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        csv_writer = None
+        if output_format == self.FORMAT_CSV:
+            csv_writer = csv.writer(buffer)
+            csv_writer.writerow(self.COLUMNS)
+        for row in self.__query_rows(from_update, to_update, final):
+            values = [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            if csv_writer:
+                csv_writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(self.COLUMNS, values))))
+                buffer.write("\n")
+            if buffer.tell() >= self.__CHUNK_BYTES:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def __gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        # Window bits of 16 + MAX_WBITS produce a gzip container instead of a raw zlib stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
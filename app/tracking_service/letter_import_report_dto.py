@@ -0,0 +1,30 @@
+from typing import List, Tuple
+
+
+class LetterImportReportDto:
+    # Maximum number of rejected rows kept for reporting, so that memory stays bounded for large imports
+    MAX_REJECTED_ROWS_KEPT = 1000
+
+    # Number of input rows read
+    rows_read: int
+    # Number of letters registered
+    inserted: int
+    # Number of rows skipped because the letter was already registered or repeated in the input
+    duplicates: int
+    # Number of rows rejected as invalid
+    rejected_count: int
+    # Line number and reason of (the first) rejected rows
+    rejected: List[Tuple[int, str]]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.rows_read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected_count = 0
+        self.rejected = []
+
+    def reject(self, line_number: int, reason: str) -> None:
+        self.rejected_count += 1
+        if len(self.rejected) < self.MAX_REJECTED_ROWS_KEPT:
+            self.rejected.append((line_number, reason))
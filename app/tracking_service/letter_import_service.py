@@ -0,0 +1,169 @@
+import csv
+import json
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.letter import Letter
+from .letter_import_report_dto import LetterImportReportDto
+
+
+class LetterImportService:
+    # Number of rows inserted per executemany call (one transaction per chunk)
+    DEFAULT_CHUNK_SIZE = 5000
+    # Maximum length of a tracking number, as defined by the letter schema
+    __MAX_TRACKING_NUMBER_LENGTH = 256
+    # Supported input formats
+    FORMAT_CSV = "csv"
+    FORMAT_JSONL = "jsonl"
+
+    # Active database session
+    db_session: Session
+    # Number of rows per insert chunk
+    chunk_size: int
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        super().__init__()
+        self.db_session = db.session
+        self.chunk_size = chunk_size
+
+    def import_letters(self,
+                       source: TextIO,
+                       input_format: str,
+                       on_progress: Optional[Callable[[LetterImportReportDto], None]] = None) -> LetterImportReportDto:
+        """
+        Registers letters for tracking in bulk, without calling the tracking API.
+        New letters are inserted as non-final without any status, therefore they are due for the next refresh run.
+        :param source: Text stream with one tracking number per row (CSV or JSONL)
+        :param input_format: Format of the input stream ("csv" or "jsonl")
+        :param on_progress: Optional callback invoked with the running report after every committed chunk
+        :return: Report of inserted, duplicate and rejected rows
+        :raises:
+            ValueError: In case of unsupported input format
+        """
+        report = LetterImportReportDto()
+        rows = self.__read_rows(source, input_format)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            tracking_numbers = []
+            for line_number, tracking_number, rejection_reason in chunk:
+                report.rows_read += 1
+                if rejection_reason:
+                    report.reject(line_number, rejection_reason)
+                else:
+                    tracking_numbers.append(tracking_number)
+            self.__insert_chunk(tracking_numbers, report)
+            if on_progress:
+                on_progress(report)
+        return report
+
+    def __insert_chunk(self, tracking_numbers: List[str], report: LetterImportReportDto) -> None:
+        """
+        Inserts the new tracking numbers of a chunk in a single transaction,
+        skipping the ones that are duplicated within the chunk or already registered in the database
+        :param tracking_numbers: Valid tracking numbers of the chunk
+        :param report: Running import report to be updated
+        """
+        # Deduplicate within the chunk, preserving input order
+        unique_numbers = list(dict.fromkeys(tracking_numbers))
+        report.duplicates += len(tracking_numbers) - len(unique_numbers)
+        if not unique_numbers:
+            return
+        try:
+            new_numbers = self.__exclude_registered(unique_numbers)
+            self.__execute_insert(new_numbers)
+        except IntegrityError:
+            # Letters may have been registered concurrently (e.g. by a lookup), so retry once against a fresh view
+            self.db_session.rollback()
+            new_numbers = self.__exclude_registered(unique_numbers)
+            self.__execute_insert(new_numbers)
+        report.inserted += len(new_numbers)
+        report.duplicates += len(unique_numbers) - len(new_numbers)
+
+    def __exclude_registered(self, tracking_numbers: List[str]) -> List[str]:
+        """
+        :param tracking_numbers: Unique tracking numbers
+        :return: Tracking numbers that are not yet registered, looked up through the unique tracking number index
+        """
+        registered = set()
+        # Keep the number of bound parameters per statement below SQLite's limit
+        for offset in range(0, len(tracking_numbers), 900):
+            batch = tracking_numbers[offset:offset + 900]
+            registered.update(
+                number for (number,) in
+                self.db_session.query(Letter.tracking_number).filter(Letter.tracking_number.in_(batch))
+            )
+        return [number for number in tracking_numbers if number not in registered]
+
+    def __execute_insert(self, tracking_numbers: List[str]) -> None:
+        if tracking_numbers:
+            self.db_session.execute(
+                Letter.__table__.insert(),
+                [{'tracking_number': number, 'status': None, 'final': False} for number in tracking_numbers]
+            )
+        self.db_session.commit()
+
+    def __read_rows(self, source: TextIO, input_format: str) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        :param source: Text stream with one tracking number per row
+        :param input_format: Format of the input stream ("csv" or "jsonl")
+        :return: Generator of (line number, tracking number, rejection reason) tuples
+        :raises:
+            ValueError: In case of unsupported input format
+        """
+        if input_format == self.FORMAT_CSV:
+            raw_rows = self.__read_csv(source)
+        elif input_format == self.FORMAT_JSONL:
+            raw_rows = self.__read_jsonl(source)
+        else:
+            raise ValueError(f"Unsupported import format \"{input_format}\"")
+        for line_number, tracking_number, rejection_reason in raw_rows:
+            if not rejection_reason:
+                tracking_number = tracking_number.strip() if isinstance(tracking_number, str) else None
+                if not tracking_number:
+                    rejection_reason = "Missing tracking number"
+                elif len(tracking_number) > self.__MAX_TRACKING_NUMBER_LENGTH:
+                    rejection_reason = "Tracking number too long"
+            yield line_number, tracking_number, rejection_reason
+
+    @staticmethod
+    def __read_csv(source: TextIO) -> Iterable[Tuple[int, Optional[str], Optional[str]]]:
+        # A "tracking_number" header column is used if present, otherwise the first column of every row
+        reader = csv.reader(source)
+        column = 0
+        for row in reader:
+            if reader.line_num == 1 and "tracking_number" in row:
+                column = row.index("tracking_number")
+                continue
+            if not row:
+                continue
+            if column >= len(row):
+                yield reader.line_num, None, "Missing tracking number column"
+            else:
+                yield reader.line_num, row[column], None
+
+    @staticmethod
+    def __read_jsonl(source: TextIO) -> Iterable[Tuple[int, Optional[str], Optional[str]]]:
+        # Every line is either a JSON string (or integer) or an object with a "tracking_number" field
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError:
+                yield line_number, None, "Invalid JSON"
+                continue
+            if isinstance(value, dict):
+                value = value.get("tracking_number")
+            # Numeric shipment ids are common in JSON exports, but any other type cannot be a tracking number
+            if isinstance(value, int) and not isinstance(value, bool):
+                value = str(value)
+            elif value is not None and not isinstance(value, str):
+                yield line_number, None, "Invalid tracking number type"
+                continue
+            yield line_number, value, None
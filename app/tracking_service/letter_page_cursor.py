@@ -0,0 +1,42 @@
+import base64
+import binascii
+import json
+
+from .tracking_exception import InvalidPageCursorException
+
+
+class LetterPageCursor:
+    # Update timestamp of the last letter of the page, as stored in the database
+    updated: str
+    # Id of the last letter of the page
+    letter_id: int
+
+    def __init__(self, updated: str, letter_id: int) -> None:
+        super().__init__()
+        self.updated = updated
+        self.letter_id = letter_id
+
+    def encode(self) -> str:
+        """
+        :return: Opaque URL-safe representation of the cursor
+        """
+        raw = json.dumps([self.updated, self.letter_id], separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode(encoded: str):
+        """
+        Factory method which restores a cursor from its opaque representation
+        :param encoded: Opaque representation generated by encode()
+        :return: LetterPageCursor
+        :raises:
+            InvalidPageCursorException: In case the cursor is malformed
+        """
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            updated, letter_id = json.loads(raw.decode('utf-8'))
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise InvalidPageCursorException()
+        if not isinstance(updated, str) or not isinstance(letter_id, int):
+            raise InvalidPageCursorException()
+        return LetterPageCursor(updated, letter_id)
@@ -0,0 +1,35 @@
+class RefreshRunStats:
+    # Number of letters whose tracking was attempted
+    attempted: int
+    # Number of letters whose status changed
+    changed: int
+    # Number of letters whose status did not change
+    unchanged: int
+    # Number of letters that could not be tracked
+    failed: int
+    # Seconds spent waiting for the tracking API
+    upstream_seconds: float
+    # Seconds spent saving tracking information in the database
+    db_seconds: float
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.attempted = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.upstream_seconds = 0.0
+        self.db_seconds = 0.0
+
+    def record_result(self, previous_status: str, new_status: str) -> None:
+        """
+        :param previous_status: Known status of the letter before tracking it
+        :param new_status: Tracked status of the letter (None if it could not be tracked)
+        """
+        self.attempted += 1
+        if new_status is None:
+            self.failed += 1
+        elif new_status != previous_status:
+            self.changed += 1
+        else:
+            self.unchanged += 1
@@ -15,3 +15,7 @@ class InvalidTrackingResponseException(Exception):
 
 class NoTrackingEventException(Exception):
     pass
+
+
+class InvalidPageCursorException(Exception):
+    pass
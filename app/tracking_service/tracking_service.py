@@ -1,20 +1,30 @@
 import logging
 from datetime import datetime
 from threading import Thread
+from time import perf_counter
+from typing import List, Optional, Tuple
 
-import requests
+from flask import Flask, current_app
+from sqlalchemy import String, and_, bindparam, cast, or_
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from sqlalchemy.sql.expression import false
 
-from app import app, db
+from app import db
+from app.la_poste_replay.response_recorder import ResponseRecorder
 from app.models.letter import Letter
+from app.models.refresh_run import RefreshRun
 from app.models.status_update import StatusUpdate
+from app.profiling.request_profiler import DB, UPSTREAM, profiled_background_task, timed
 from .tracking_exception import (
     CannotTrackLetterException,
     CannotUpdateLetterTrackingException,
     InvalidTrackingResponseException
 )
+from .letter_page_cursor import LetterPageCursor
+from .refresh_run_stats import RefreshRunStats
 from .tracking_response_dto import TrackingResponseDto
+from .upstream_dispatcher import BACKGROUND, INTERACTIVE, UpstreamDispatcher, get_upstream_dispatcher
 
 
 class TrackingService:
@@ -25,34 +35,68 @@ class TrackingService:
     api_base_url: str
     # Authorization key for tracking API
     api_key: str
+    # Optional recorder of tracking API responses
+    response_recorder: Optional[ResponseRecorder]
 
+    # Application the service is running in (needed to run background tasks in an application context)
+    app: Flask
     # Active database session
     db_session: Session
     # Whether the application is running in debug mode
     is_debug: bool
+    # Statistics of the refresh run in progress (None when no refresh run is in progress)
+    refresh_run_stats: Optional[RefreshRunStats]
 
     def __init__(self) -> None:
         super().__init__()
-        self.api_base_url = app.config.get('LA_POSTE_API_BASE_URL')
-        self.api_key = app.config.get('LA_POSTE_API_KEY')
+        self.app = current_app._get_current_object()
+        self.api_base_url = self.app.config.get('LA_POSTE_API_BASE_URL')
+        self.api_key = self.app.config.get('LA_POSTE_API_KEY')
+        record_path = self.app.config.get('LA_POSTE_RECORD_PATH')
+        self.response_recorder = ResponseRecorder(record_path) if record_path else None
         self.db_session = db.session
-        self.is_debug = app.config.get('APP_DEBUG')
+        self.is_debug = self.app.config.get('APP_DEBUG')
+        self.refresh_run_stats = None
 
-    def track_letter(self, shipment_d: str) -> str:
+    @property
+    def dispatcher(self) -> UpstreamDispatcher:
+        """
+        :return: Dispatcher giving interactive lookups priority over background refresh
+            (looked up on use, since read-only operations never call the tracking API)
+        """
+        return get_upstream_dispatcher(self.app)
+
+    def track_letter(self, shipment_d: str, priority: int = INTERACTIVE) -> str:
         """
         Tracks a letter, updates tracking status in database, and returns the latest tracked status
         :param shipment_d: Shipment id of letter
+        :param priority: INTERACTIVE for lookups a user is waiting for, BACKGROUND for refresh runs
         :return: Latest tracked status of letter
         :raises:
             CannotTrackLetterException: In case of unexpected tracking error
         """
+        # Imported on first use, since it is only needed when the API is actually called
+        import requests
+
         # Call API and return tracking status
         url = '{b_url}/suivi-unifie/idship/{sh_id}?lang=en_GB'.format(
             b_url=self.api_base_url,
             sh_id=shipment_d
         )
         try:
-            response = requests.get(url, headers={'X-Okapi-Key': self.api_key, 'Accept': 'application/json'})
+            # Timing starts once a slot is acquired, so that queueing is not reported as upstream latency
+            with self.dispatcher.upstream.slot(priority), timed(UPSTREAM):
+                upstream_started = perf_counter()
+                try:
+                    response = requests.get(url, headers={'X-Okapi-Key': self.api_key, 'Accept': 'application/json'})
+                finally:
+                    # Failed calls (e.g. connection errors) are accounted as well
+                    upstream_seconds = perf_counter() - upstream_started
+                    if self.refresh_run_stats:
+                        self.refresh_run_stats.upstream_seconds += upstream_seconds
+            if self.response_recorder:
+                self.response_recorder.record(shipment_d, response.status_code, upstream_seconds,
+                                              response.headers.get('Content-Type'), response.text)
             if response.status_code != 200:
                 raise CannotTrackLetterException(
                     "API call unsuccessful with status {resp_code} - \"{resp_mess}\"".format(
@@ -66,7 +110,13 @@ class TrackingService:
                 raise CannotTrackLetterException("Invalid response from API")
             letter_status = trackingResponse.get_last_event_status()
             try:
-                self.__save_letter_tracking_info(shipment_d, letter_status, trackingResponse.is_final)
+                with self.dispatcher.db_writer.slot(priority), timed(DB):
+                    db_started = perf_counter()
+                    try:
+                        self.__save_letter_tracking_info(shipment_d, letter_status, trackingResponse.is_final)
+                    finally:
+                        if self.refresh_run_stats:
+                            self.refresh_run_stats.db_seconds += perf_counter() - db_started
             except CannotUpdateLetterTrackingException as UpdateException:
                 # Log tracking update error for future reference/audit
                 logging.error(UpdateException.log_message)
@@ -95,7 +145,7 @@ class TrackingService:
         # Find letters in database that are not final, i.e. there is a potential change of tracking status
         # Tracking the status of only non-final letters is pivotal when it comes to scalability,
         # Since final letters will be piled up more and more in the database, without any potential change in status
-        thread = Thread(target=self.track_all_registered_letters_in_database)
+        thread = self.__create_background_thread(self.track_all_registered_letters_in_database)
         # Return current tracking status
         letter_statuses = {}
         letter_results = Letter.query.order_by(Letter.updated.desc())
@@ -106,34 +156,139 @@ class TrackingService:
         return letter_statuses
 
     def track_all_registered_letters_in_database(self):
-        for batch in self.__get_letter_tracking_batches():
-            self.__process_letter_tracking_batch(batch)
+        self.__run_refresh()
 
-    def track_letters_updated_between(self, from_update: datetime, to_update: datetime):
+    def get_letters_updated_between(self,
+                                    from_update: datetime,
+                                    to_update: datetime,
+                                    limit: int,
+                                    cursor: Optional[LetterPageCursor] = None,
+                                    final: Optional[bool] = None,
+                                    status: Optional[str] = None) -> Tuple[dict, Optional[LetterPageCursor]]:
         """
-        Tracks letters updated within a date/time range in the database asynchronously,
-        i.e. returns the current known status of each letter and then asynchronously updates every letter's status
-        :param from_update: Optional update timestamp to filter letters from
-        :param to_update: Optional update timestamp to filter letters until
-        :return: Dictionary containing the latest tracked status of each letter
+        Returns one page of the current known status of letters updated within a date/time range,
+        ordered from the most recently updated, using keyset pagination on (update timestamp, id)
+        :param from_update: Update timestamp to filter letters from
+        :param to_update: Update timestamp to filter letters until
+        :param limit: Maximum number of letters in the page
+        :param cursor: Optional cursor returned with the previous page
+        :param final: Optional finality to filter letters by
+        :param status: Optional status text to filter letters by
+        :return: Dictionary containing the known status of each letter in the page,
+            and the cursor of the next page (None if this is the last page)
         """
-        # Find letters in database that are not final, i.e. there is a potential change of tracking status
-        # Tracking the status of only non-final letters is pivotal when it comes to scalability,
-        # Since final letters will be piled up more and more in the database, without any potential change in status
-        thread = Thread(target=self.track_letters_in_range, args=(from_update, to_update))
-        # Return current tracking status
-        letter_statuses = {}
-        letter_results = Letter.query.order_by(Letter.updated.desc()) \
+        # The raw stored text of the update timestamp is used as cursor key,
+        # since a timestamp stored without fractional seconds does not compare equal to a re-bound datetime value
+        updated_key = cast(Letter.updated, String)
+        letter_query = self.db_session.query(Letter.id, Letter.tracking_number, Letter.status, updated_key) \
             .filter(Letter.updated >= from_update).filter(Letter.updated <= to_update)
-        for letter in letter_results:
-            letter_statuses[letter.tracking_number] = letter.status
-        # Start asynchronous task on return
-        thread.start()
-        return letter_statuses
+        if final is not None:
+            letter_query = letter_query.filter(Letter.final == final)
+        if status is not None:
+            letter_query = letter_query.filter(Letter.status == status)
+        if cursor:
+            cursor_updated = bindparam('cursor_updated', cursor.updated, type_=String)
+            letter_query = letter_query.filter(or_(
+                Letter.updated < cursor_updated,
+                and_(Letter.updated == cursor_updated, Letter.id < cursor.letter_id)
+            ))
+        # Fetch one extra letter to detect whether there is a next page
+        letter_results = letter_query.order_by(Letter.updated.desc(), Letter.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(letter_results) > limit:
+            letter_results = letter_results[:limit]
+            last_id, _, _, last_updated = letter_results[-1]
+            next_cursor = LetterPageCursor(last_updated, last_id)
+        letter_statuses = {}
+        for _, tracking_number, letter_status, _ in letter_results:
+            letter_statuses[tracking_number] = letter_status
+        return letter_statuses, next_cursor
+
+    def refresh_letters_updated_between(self, from_update: datetime, to_update: datetime) -> None:
+        """
+        Asynchronously updates the status of every non-final letter updated within a date/time range
+        :param from_update: Update timestamp to filter letters from
+        :param to_update: Update timestamp to filter letters until
+        """
+        self.__create_background_thread(self.track_letters_in_range, from_update, to_update).start()
 
     def track_letters_in_range(self, from_update: datetime, to_update: datetime):
-        for batch in self.__get_letter_tracking_batches(from_update, to_update):
-            self.__process_letter_tracking_batch(batch)
+        self.__run_refresh(from_update, to_update)
+
+    def get_recent_refresh_runs(self, limit: int) -> List[RefreshRun]:
+        """
+        :param limit: Maximum number of refresh runs to return
+        :return: Most recently started refresh runs, latest first
+        """
+        return RefreshRun.query.order_by(RefreshRun.started.desc(), RefreshRun.id.desc()).limit(limit).all()
+
+    def __run_refresh(self, from_update: datetime = None, to_update: datetime = None) -> None:
+        """
+        Tracks every non-final letter (optionally within an update range) and records the run in the refresh ledger
+        :param from_update: Optional update timestamp to filter letters from
+        :param to_update: Optional update timestamp to filter letters until
+        """
+        # The run is registered when it starts, so that unfinished runs can be detected
+        refresh_run = self.__register_refresh_run(from_update, to_update)
+        stats = RefreshRunStats()
+        self.refresh_run_stats = stats
+        started = perf_counter()
+        error = None
+        try:
+            for batch in self.__get_letter_tracking_batches(from_update, to_update):
+                self.__process_letter_tracking_batch(batch)
+        except Exception as e:
+            error = str(e)
+            logging.error(f"Refresh run failed: {error}")
+            self.db_session.rollback()
+        finally:
+            self.refresh_run_stats = None
+        if refresh_run:
+            self.__complete_refresh_run(refresh_run, stats, perf_counter() - started, error)
+
+    def __register_refresh_run(self, from_update: datetime, to_update: datetime) -> Optional[RefreshRun]:
+        """
+        :param from_update: Optional update timestamp the run is filtered from
+        :param to_update: Optional update timestamp the run is filtered until
+        :return: Registered refresh run (None if it could not be registered, in which case the run is not recorded)
+        """
+        refresh_run = RefreshRun(from_update=from_update, to_update=to_update)
+        try:
+            self.db_session.add(refresh_run)
+            self.db_session.commit()
+        except SQLAlchemyError as e:
+            # The ledger is only bookkeeping, therefore the refresh itself goes on
+            logging.error(f"Cannot register refresh run: {e}")
+            self.db_session.rollback()
+            return None
+        return refresh_run
+
+    def __complete_refresh_run(self,
+                               refresh_run: RefreshRun,
+                               stats: RefreshRunStats,
+                               elapsed_seconds: float,
+                               error: Optional[str]) -> None:
+        try:
+            refresh_run.finish(stats.attempted, stats.changed, stats.unchanged, stats.failed,
+                               stats.upstream_seconds, stats.db_seconds, elapsed_seconds, error)
+            self.db_session.add(refresh_run)
+            self.db_session.commit()
+        except SQLAlchemyError as e:
+            logging.error(f"Cannot complete refresh run: {e}")
+            self.db_session.rollback()
+
+    def __create_background_thread(self, target, *args) -> Thread:
+        """
+        :param target: Task to be run asynchronously
+        :param args: Arguments of the task
+        :return: Thread (not yet started) running the task within an application context
+        """
+        def run_in_app_context():
+            with self.app.app_context():
+                target(*args)
+
+        # Background tasks started by a profiled request are profiled as well
+        return Thread(target=profiled_background_task("refresh", run_in_app_context))
 
     def __get_letter_tracking_batches(self, from_update: datetime = None, to_update: datetime = None):
         """
@@ -162,7 +317,13 @@ class TrackingService:
 
     def __process_letter_tracking_batch(self, batch):
         for letter in batch.items:
-            self.track_letter(letter.tracking_number)
+            previous_status = letter.status
+            try:
+                new_status = self.track_letter(letter.tracking_number, BACKGROUND)
+            except CannotTrackLetterException:
+                new_status = None
+            if self.refresh_run_stats:
+                self.refresh_run_stats.record_result(previous_status, new_status)
 
     def __save_letter_tracking_info(self, shipment_id: str, status: str, is_final: bool) -> None:
         """
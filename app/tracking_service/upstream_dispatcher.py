@@ -0,0 +1,183 @@
+import time
+from contextlib import contextmanager
+from threading import Condition, Lock
+from typing import Optional
+
+from flask import Flask
+
+# Priority classes, e.g. a user waiting for the response of a lookup is interactive, a refresh run is background
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Key of the dispatcher in the extensions of the application
+_EXTENSION_KEY = "upstream_dispatcher"
+_extension_lock = Lock()
+
+
+class PriorityLimiter:
+    """
+    Limits the concurrency (and optionally the rate) of an operation shared by interactive and background work.
+    Interactive work always goes ahead of queued background work, and a share of the concurrency and of the rate
+    is reserved for interactive work. Background work is throttled back while interactive work is in flight.
+    """
+    # Maximum number of operations in flight
+    max_concurrency: int
+    # Number of concurrency slots that background work never uses
+    interactive_reserved: int
+    # Optional maximum number of operations started per second
+    rate_limit: Optional[float]
+    # Fraction of the rate (burst) that background work never uses
+    interactive_reserved_quota: float
+
+    def __init__(self,
+                 max_concurrency: int,
+                 interactive_reserved: int = 0,
+                 rate_limit: Optional[float] = None,
+                 interactive_reserved_quota: float = 0.0) -> None:
+        super().__init__()
+        if max_concurrency < 1 or not 0 <= interactive_reserved < max_concurrency:
+            raise ValueError("Concurrency must be positive and larger than the interactive reserved share")
+        if not 0 <= interactive_reserved_quota < 1:
+            raise ValueError("Interactive reserved quota must be a fraction in [0, 1)")
+        self.max_concurrency = max_concurrency
+        self.interactive_reserved = interactive_reserved
+        self.rate_limit = rate_limit
+        self.interactive_reserved_quota = interactive_reserved_quota
+        self.__condition = Condition()
+        self.__in_flight = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.__interactive_waiting = 0
+        # Token bucket with a burst of one second worth of operations, plus the part reserved for interactive work
+        burst = max(float(rate_limit or 0), 1.0)
+        self.__reserved_tokens = burst * interactive_reserved_quota
+        self.__bucket_size = burst + self.__reserved_tokens
+        self.__bucket_lock = Lock()
+        self.__tokens = self.__bucket_size
+        self.__tokens_updated = time.monotonic()
+
+    @contextmanager
+    def slot(self, priority: int):
+        """
+        Context manager holding a slot of the limiter for the duration of an operation
+        :param priority: INTERACTIVE or BACKGROUND
+        """
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def acquire(self, priority: int) -> None:
+        with self.__condition:
+            if priority == INTERACTIVE:
+                self.__interactive_waiting += 1
+                try:
+                    self.__condition.wait_for(lambda: self.__total_in_flight() < self.max_concurrency)
+                finally:
+                    self.__interactive_waiting -= 1
+            else:
+                self.__condition.wait_for(self.__can_start_background)
+            self.__in_flight[priority] += 1
+        try:
+            self.__take_token(priority)
+        except BaseException:
+            self.release(priority)
+            raise
+
+    def release(self, priority: int) -> None:
+        with self.__condition:
+            self.__in_flight[priority] -= 1
+            self.__condition.notify_all()
+
+    def in_flight(self, priority: int) -> int:
+        with self.__condition:
+            return self.__in_flight[priority]
+
+    def __total_in_flight(self) -> int:
+        return self.__in_flight[INTERACTIVE] + self.__in_flight[BACKGROUND]
+
+    def __can_start_background(self) -> bool:
+        # Background work never overtakes waiting interactive work,
+        # and its share shrinks by every interactive operation in flight
+        if self.__interactive_waiting:
+            return False
+        background_limit = self.max_concurrency - self.interactive_reserved - self.__in_flight[INTERACTIVE]
+        return self.__in_flight[BACKGROUND] < background_limit \
+            and self.__total_in_flight() < self.max_concurrency
+
+    def __take_token(self, priority: int) -> None:
+        if not self.rate_limit:
+            return
+        # Background work leaves the reserved part of the bucket to interactive work
+        required = 1.0 if priority == INTERACTIVE else 1.0 + self.__reserved_tokens
+        while True:
+            with self.__bucket_lock:
+                now = time.monotonic()
+                self.__tokens = min(self.__bucket_size,
+                                    self.__tokens + (now - self.__tokens_updated) * self.rate_limit)
+                self.__tokens_updated = now
+                if self.__tokens >= required:
+                    self.__tokens -= 1.0
+                    return
+                wait_seconds = (required - self.__tokens) / self.rate_limit
+            time.sleep(wait_seconds)
+
+
+class UpstreamDispatcher:
+    # Limiter of calls to the tracking API
+    upstream: PriorityLimiter
+    # Limiter of tracking updates written to the database (a single writer, e.g. for SQLite)
+    db_writer: PriorityLimiter
+
+    def __init__(self, upstream: PriorityLimiter, db_writer: PriorityLimiter) -> None:
+        super().__init__()
+        self.upstream = upstream
+        self.db_writer = db_writer
+
+    @staticmethod
+    def from_config(config: dict):
+        """
+        Factory method which generates a dispatcher according to the configuration of an application
+        :param config: Configuration of the application
+        :return: UpstreamDispatcher
+        :raises:
+            ValueError: In case of invalid UPSTREAM_* settings
+        """
+        try:
+            upstream = PriorityLimiter(
+                max_concurrency=config.get('UPSTREAM_MAX_CONCURRENCY'),
+                interactive_reserved=config.get('UPSTREAM_INTERACTIVE_RESERVED'),
+                rate_limit=config.get('UPSTREAM_RATE_LIMIT'),
+                interactive_reserved_quota=config.get('UPSTREAM_INTERACTIVE_RESERVED_QUOTA')
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid upstream configuration: {e} (UPSTREAM_MAX_CONCURRENCY="
+                             f"{config.get('UPSTREAM_MAX_CONCURRENCY')}, UPSTREAM_INTERACTIVE_RESERVED="
+                             f"{config.get('UPSTREAM_INTERACTIVE_RESERVED')})") from e
+        return UpstreamDispatcher(upstream, PriorityLimiter(max_concurrency=1))
+
+
+def init_upstream_dispatcher(app: Flask) -> None:
+    """
+    Creates the dispatcher of an application, so that invalid settings are reported at startup instead of on requests
+    :param app: Application
+    :raises:
+        ValueError: In case of invalid UPSTREAM_* settings
+    """
+    with _extension_lock:
+        app.extensions[_EXTENSION_KEY] = UpstreamDispatcher.from_config(app.config)
+
+
+def get_upstream_dispatcher(app: Flask) -> UpstreamDispatcher:
+    """
+    :param app: Application
+    :return: Dispatcher shared by all requests and background tasks of the application
+        (created on first use, unless it was created with the application)
+    """
+    dispatcher = app.extensions.get(_EXTENSION_KEY)
+    if dispatcher is None:
+        with _extension_lock:
+            dispatcher = app.extensions.get(_EXTENSION_KEY)
+            if dispatcher is None:
+                dispatcher = UpstreamDispatcher.from_config(app.config)
+                app.extensions[_EXTENSION_KEY] = dispatcher
+    return dispatcher
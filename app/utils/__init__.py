@@ -0,0 +1 @@
+__all__ = ["timestamp_parser"]
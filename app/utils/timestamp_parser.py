@@ -0,0 +1,25 @@
+from datetime import datetime
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parses a timestamp, using a strict ISO-8601 fast path before falling back to the general-purpose parser
+    :param value: Timestamp text, e.g. "2022-05-01T23:41:27.119735+00:00"
+    :return: Parsed timestamp
+    :raises:
+        ValueError: In case the text cannot be parsed as a timestamp
+    """
+    # datetime.fromisoformat() does not accept the "Z" suffix before Python 3.11
+    iso_value = value[:-1] + "+00:00" if value.endswith(("Z", "z")) else value
+    try:
+        return datetime.fromisoformat(iso_value)
+    except ValueError:
+        pass
+    # Imported on first use, since the fast path covers the timestamps generated by clients in practice
+    from dateutil import parser
+
+    # dateutil raises ParserError (subclass of ValueError), or OverflowError for out-of-range numbers
+    try:
+        return parser.parse(value)
+    except OverflowError as e:
+        raise ValueError(str(e))
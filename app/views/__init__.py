@@ -1,21 +1,38 @@
-from dateutil import parser
-from dateutil.parser import ParserError
+from typing import Optional
 
-from app import app
-from app.tracking_service.tracking_exception import CannotTrackLetterException
+from flask import Blueprint, Response, request, stream_with_context
+
+from app.tracking_service.letter_export_service import LetterExportService
+from app.tracking_service.letter_page_cursor import LetterPageCursor
+from app.tracking_service.tracking_exception import CannotTrackLetterException, InvalidPageCursorException
 from app.tracking_service.tracking_service import TrackingService
+from app.utils.timestamp_parser import parse_timestamp
 from app.views.batch_tracking_api_result_dto import BatchTrackingApiResultDto
+from app.views.paginated_tracking_api_result_dto import PaginatedTrackingApiResultDto
+from app.views.refresh_run_api_result_dto import RefreshRunApiResultDto
+from app.views.refresh_run_list_api_result_dto import RefreshRunListApiResultDto
 from app.views.tracking_api_result_dto import TrackingApiResultDto
 
+# Page size of range queries, unless specified otherwise by the caller
+DEFAULT_PAGE_LIMIT = 100
+# Maximum page size of range queries
+MAX_PAGE_LIMIT = 1000
+# Number of refresh runs listed, unless specified otherwise by the caller
+DEFAULT_REFRESH_RUN_LIMIT = 20
+# Maximum number of refresh runs listed
+MAX_REFRESH_RUN_LIMIT = 500
+
+api = Blueprint("api", __name__)
+
 
-@app.route("/letters/all", methods=["GET"])
+@api.route("/letters/all", methods=["GET"])
 def get_all_letters_statuses():
     trackingService = TrackingService()
     tracking_statuses = trackingService.track_all_registered_letters()
     return BatchTrackingApiResultDto(tracking_statuses).__dict__
 
 
-@app.route("/letters/by_ship_id/<string:shipment_id>", methods=["GET"])
+@api.route("/letters/by_ship_id/<string:shipment_id>", methods=["GET"])
 def get_letter_status(shipment_id: str):
     trackingService = TrackingService()
     try:
@@ -25,16 +42,114 @@ def get_letter_status(shipment_id: str):
     return TrackingApiResultDto(tracking_status).__dict__
 
 
-@app.route("/letters/by_update/<string:from_date>/<string:to_date>", methods=["GET"])
+@api.route("/letters/by_update/<string:from_date>/<string:to_date>", methods=["GET"])
 def get_letter_status_updated_within(from_date: str, to_date: str):
     try:
-        from_date = parser.parse(from_date)
-    except ParserError:
+        from_date = parse_timestamp(from_date)
+    except ValueError:
         return "Invalid from-date", 400
     try:
-        to_date = parser.parse(to_date)
-    except ParserError:
+        to_date = parse_timestamp(to_date)
+    except ValueError:
         return "Invalid to-date", 400
+    try:
+        limit = _parse_limit_arg(DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT)
+    except ValueError:
+        return f"Invalid limit (expected 1 to {MAX_PAGE_LIMIT})", 400
+    cursor = None
+    if request.args.get("cursor"):
+        try:
+            cursor = LetterPageCursor.decode(request.args["cursor"])
+        except InvalidPageCursorException:
+            return "Invalid cursor", 400
+    try:
+        final = _parse_bool_arg("final")
+    except ValueError:
+        return "Invalid final (expected true or false)", 400
+    try:
+        refresh = _parse_bool_arg("refresh")
+    except ValueError:
+        return "Invalid refresh (expected true or false)", 400
+    # An empty status filter is the same as no filter
+    status = request.args.get("status") or None
     trackingService = TrackingService()
-    tracking_statuses = trackingService.track_letters_updated_between(from_date, to_date)
-    return BatchTrackingApiResultDto(tracking_statuses).__dict__
+    tracking_statuses, next_cursor = trackingService.get_letters_updated_between(
+        from_date, to_date, limit, cursor, final, status)
+    # Refreshing the whole range is expensive, therefore it is only started on demand
+    if refresh:
+        trackingService.refresh_letters_updated_between(from_date, to_date)
+    return PaginatedTrackingApiResultDto(tracking_statuses, next_cursor.encode() if next_cursor else None).__dict__
+
+
+@api.route("/refresh-runs", methods=["GET"])
+def get_refresh_runs():
+    try:
+        limit = _parse_limit_arg(DEFAULT_REFRESH_RUN_LIMIT, MAX_REFRESH_RUN_LIMIT)
+    except ValueError:
+        return f"Invalid limit (expected 1 to {MAX_REFRESH_RUN_LIMIT})", 400
+    trackingService = TrackingService()
+    refresh_runs = trackingService.get_recent_refresh_runs(limit)
+    return RefreshRunListApiResultDto(
+        [RefreshRunApiResultDto(refresh_run).__dict__ for refresh_run in refresh_runs]
+    ).__dict__
+
+
+@api.route("/letters/export", methods=["GET"])
+def export_letters():
+    output_format = request.args.get("format", LetterExportService.FORMAT_JSONL)
+    if output_format not in (LetterExportService.FORMAT_JSONL, LetterExportService.FORMAT_CSV):
+        return "Invalid format", 400
+    try:
+        compress = bool(_parse_bool_arg("gzip"))
+    except ValueError:
+        return "Invalid gzip (expected true or false)", 400
+    try:
+        from_update = parse_timestamp(request.args["from"]) if "from" in request.args else None
+    except ValueError:
+        return "Invalid from-date", 400
+    try:
+        to_update = parse_timestamp(request.args["to"]) if "to" in request.args else None
+    except ValueError:
+        return "Invalid to-date", 400
+    try:
+        final = _parse_bool_arg("final")
+    except ValueError:
+        return "Invalid final (expected true or false)", 400
+    exportService = LetterExportService()
+    chunks = exportService.export_letters(output_format, compress, from_update, to_update, final)
+    file_name = f"letters.{output_format}" + (".gz" if compress else "")
+    mimetype = "text/csv" if output_format == LetterExportService.FORMAT_CSV else "application/x-ndjson"
+    if compress:
+        mimetype = "application/gzip"
+    return Response(stream_with_context(chunks),
+                    mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={file_name}"})
+
+
+def _parse_limit_arg(default: int, maximum: int) -> int:
+    """
+    :param default: Limit used if the request does not specify one
+    :param maximum: Maximum accepted limit
+    :return: Value of the "limit" query parameter of the current request
+    :raises:
+        ValueError: In case the limit is not an integer between 1 and the maximum
+    """
+    limit = int(request.args.get("limit", default))
+    if limit < 1 or limit > maximum:
+        raise ValueError(limit)
+    return limit
+
+
+def _parse_bool_arg(name: str) -> Optional[bool]:
+    """
+    :param name: Name of the query parameter
+    :return: Value of the boolean query parameter of the current request (None if it is not specified)
+    :raises:
+        ValueError: In case the value is neither "true" nor "false"
+    """
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if value.lower() not in ("true", "false"):
+        raise ValueError(value)
+    return value.lower() == "true"
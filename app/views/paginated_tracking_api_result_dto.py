@@ -0,0 +1,10 @@
+from typing import Optional
+
+
+class PaginatedTrackingApiResultDto:
+    status_per_ship_id: dict
+    next_cursor: Optional[str]
+
+    def __init__(self, status_per_ship_id: dict, next_cursor: Optional[str]) -> None:
+        self.status_per_ship_id = status_per_ship_id
+        self.next_cursor = next_cursor
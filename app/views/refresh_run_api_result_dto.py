@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from app.models.refresh_run import RefreshRun
+
+
+class RefreshRunApiResultDto:
+    id: int
+    started: Optional[str]
+    finished: Optional[str]
+    from_update: Optional[str]
+    to_update: Optional[str]
+    letters_attempted: int
+    letters_changed: int
+    letters_unchanged: int
+    letters_failed: int
+    upstream_seconds: float
+    db_seconds: float
+    letters_per_second: Optional[float]
+    error: Optional[str]
+
+    def __init__(self, refresh_run: RefreshRun) -> None:
+        self.id = refresh_run.id
+        self.started = self.__format_timestamp(refresh_run.started)
+        self.finished = self.__format_timestamp(refresh_run.finished)
+        self.from_update = self.__format_timestamp(refresh_run.from_update)
+        self.to_update = self.__format_timestamp(refresh_run.to_update)
+        self.letters_attempted = refresh_run.letters_attempted
+        self.letters_changed = refresh_run.letters_changed
+        self.letters_unchanged = refresh_run.letters_unchanged
+        self.letters_failed = refresh_run.letters_failed
+        self.upstream_seconds = refresh_run.upstream_seconds
+        self.db_seconds = refresh_run.db_seconds
+        self.letters_per_second = refresh_run.letters_per_second
+        self.error = refresh_run.error
+
+    @staticmethod
+    def __format_timestamp(timestamp: Optional[datetime]) -> Optional[str]:
+        return timestamp.isoformat() if timestamp else None
@@ -0,0 +1,8 @@
+from typing import List
+
+
+class RefreshRunListApiResultDto:
+    refresh_runs: List[dict]
+
+    def __init__(self, refresh_runs: List[dict]) -> None:
+        self.refresh_runs = refresh_runs
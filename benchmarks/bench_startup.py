@@ -0,0 +1,62 @@
+"""
+Startup-time benchmark: measures, in fresh interpreters, the time needed to import the application package
+and to create an application, and checks which heavy modules are loaded at startup.
+
+Usage: python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet prints the elapsed time in seconds on its last line
+SCENARIOS = {
+    "import app": (
+        "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+    ),
+    # Application of a server worker, i.e. without the migrations needed by the "flask db" commands only
+    "create_app(migrations=False)": (
+        "import time; start = time.perf_counter(); from app import create_app; create_app(migrations=False); "
+        "print(time.perf_counter() - start)"
+    ),
+}
+# Modules that should only be imported when they are actually used
+LAZY_MODULES = ["requests", "dateutil", "alembic", "app.la_poste_replay.replay_server"]
+
+
+def run_scenario(snippet: str, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", snippet], cwd=PROJECT_ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def loaded_lazy_modules() -> list:
+    snippet = (
+        "import sys; from app import create_app; create_app(migrations=False); "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", snippet], cwd=PROJECT_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return [module for module in output.strip().split(",") if module]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters per scenario")
+    args = arg_parser.parse_args()
+    for name, snippet in SCENARIOS.items():
+        timings = run_scenario(snippet, args.runs)
+        print(f"{name:<28} median {statistics.median(timings) * 1000:8.1f} ms"
+              f"   min {min(timings) * 1000:8.1f} ms   max {max(timings) * 1000:8.1f} ms")
+    eager_modules = loaded_lazy_modules()
+    print("Heavy modules loaded at startup: " + (", ".join(eager_modules) if eager_modules else "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Add refresh run ledger
+
+Revision ID: a3c5e1f0b7d2
+Revises: 6297642bcbc4
+Create Date: 2026-10-19 10:12:44.503817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e1f0b7d2'
+down_revision = '6297642bcbc4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('refresh_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('started', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('finished', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('from_update', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('to_update', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('letters_attempted', sa.Integer(), nullable=True),
+    sa.Column('letters_changed', sa.Integer(), nullable=True),
+    sa.Column('letters_unchanged', sa.Integer(), nullable=True),
+    sa.Column('letters_failed', sa.Integer(), nullable=True),
+    sa.Column('upstream_seconds', sa.Float(), nullable=True),
+    sa.Column('db_seconds', sa.Float(), nullable=True),
+    sa.Column('letters_per_second', sa.Float(), nullable=True),
+    sa.Column('error', sa.String(length=191), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_refresh_run_started'), 'refresh_run', ['started'], unique=False)
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    op.drop_index(op.f('ix_refresh_run_started'), table_name='refresh_run')
+    op.drop_table('refresh_run')
+    # ### end Alembic commands ###
@@ -0,0 +1,36 @@
+import gzip
+import json
+import uuid
+
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+from pytest_httpserver import HTTPServer
+
+from tests.test_fixtures import prepare_mock_la_poste_api
+
+
+def test_export_letters_bad_request(test_api_client: FlaskClient):
+    assert test_api_client.get("/letters/export?format=xml").status_code == 400
+    assert test_api_client.get("/letters/export?from=invalid_timestamp").status_code == 400
+    assert test_api_client.get("/letters/export?final=yes").status_code == 400
+    assert test_api_client.get("/letters/export?gzip=1").status_code == 400
+
+
+def test_export_letters_e2e(test_db: SQLAlchemy, httpserver: HTTPServer, test_api_client: FlaskClient):
+    # Register letter and update its status twice, so that it has two status history records
+    shipment_id = str(uuid.uuid4())
+    statuses = [f"Letter status {uuid.uuid4()}", f"Letter status {uuid.uuid4()}"]
+    for status in statuses:
+        prepare_mock_la_poste_api(httpserver, shipment_id, status)
+        test_api_client.get(f"/letters/by_ship_id/{shipment_id}")
+    # Export as gzip-compressed JSONL and look up the rows of the letter
+    response = test_api_client.get("/letters/export?format=jsonl&gzip=true&final=false")
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in gzip.decompress(response.data).decode("utf-8").splitlines()]
+    letter_rows = [row for row in rows if row["tracking_number"] == shipment_id]
+    assert [row["status_update_status"] for row in letter_rows] == statuses
+    assert all(row["status"] == statuses[-1] and row["final"] is False for row in letter_rows)
+    # Final letters only should exclude the letter
+    response = test_api_client.get("/letters/export?format=csv&final=true")
+    assert response.status_code == 200
+    assert shipment_id not in response.data.decode("utf-8")
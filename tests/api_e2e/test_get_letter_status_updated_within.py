@@ -13,6 +13,11 @@ from tests.test_fixtures import prepare_mock_la_poste_api, DEFAULT_TRACKING_STAT
 def test_get_letter_status_updated_within_bad_request(test_api_client: FlaskClient):
     response = test_api_client.get("/letters/by_update/invalid_timestamp1/invalid_timestamp2")
     assert response.status_code == 400
+    valid_range = f"{datetime.utcnow().isoformat()}/{datetime.utcnow().isoformat()}"
+    assert test_api_client.get(f"/letters/by_update/{valid_range}?limit=0").status_code == 400
+    assert test_api_client.get(f"/letters/by_update/{valid_range}?limit=abc").status_code == 400
+    assert test_api_client.get(f"/letters/by_update/{valid_range}?final=yes").status_code == 400
+    assert test_api_client.get(f"/letters/by_update/{valid_range}?cursor=invalid_cursor").status_code == 400
 
 
 @pytest.mark.asyncio
@@ -38,7 +43,7 @@ async def test_get_letter_status_updated_within(
     from_update1 = datetime.utcnow() - timedelta(hours=4)
     to_update1 = datetime.utcnow() + timedelta(minutes=10)
     response_object = test_api_client.get(
-        f"/letters/by_update/{from_update1.isoformat()}/{to_update1.isoformat()}").json
+        f"/letters/by_update/{from_update1.isoformat()}/{to_update1.isoformat()}?refresh=true").json
     assert 'status_per_ship_id' in response_object
     status_per_ship_id = response_object['status_per_ship_id']
     assert shipment_id in status_per_ship_id
@@ -57,3 +62,36 @@ async def test_get_letter_status_updated_within(
         f"/letters/by_update/{from_update2.isoformat()}/{to_update2.isoformat()}").json
     assert 'status_per_ship_id' in response_object
     assert not response_object['status_per_ship_id']
+
+
+def test_get_letter_status_updated_within_paginated(
+        test_db: SQLAlchemy,
+        test_http_server: HTTPServer,
+        test_api_client: FlaskClient
+):
+    # Register a few letters with a common status
+    common_status = f"Letter status {uuid.uuid4()}"
+    shipment_ids = {str(uuid.uuid4()) for _ in range(5)}
+    for shipment_id in shipment_ids:
+        prepare_mock_la_poste_api(test_http_server, shipment_id, common_status)
+        test_api_client.get(f"/letters/by_ship_id/{shipment_id}")
+    # Walk through all pages, filtered by status so that other letters in the testing database are excluded
+    from_update = datetime.utcnow() - timedelta(hours=4)
+    to_update = datetime.utcnow() + timedelta(minutes=10)
+    url = f"/letters/by_update/{from_update.isoformat()}/{to_update.isoformat()}"
+    returned_ship_ids = []
+    cursor = ""
+    while True:
+        response_object = test_api_client.get(url, query_string={
+            "limit": 2, "cursor": cursor, "status": common_status, "final": "false"
+        }).json
+        assert len(response_object['status_per_ship_id']) <= 2
+        assert all(status == common_status for status in response_object['status_per_ship_id'].values())
+        returned_ship_ids.extend(response_object['status_per_ship_id'])
+        cursor = response_object['next_cursor']
+        if not cursor:
+            break
+    assert sorted(returned_ship_ids) == sorted(shipment_ids)
+    # An empty status filter is ignored
+    response_object = test_api_client.get(url, query_string={"limit": 1, "status": ""}).json
+    assert len(response_object['status_per_ship_id']) == 1
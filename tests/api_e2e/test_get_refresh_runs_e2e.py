@@ -0,0 +1,40 @@
+import time
+import uuid
+
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+from pytest_httpserver import HTTPServer
+
+from tests.test_fixtures import prepare_mock_la_poste_api
+
+
+def test_get_refresh_runs_bad_request(test_api_client: FlaskClient):
+    assert test_api_client.get("/refresh-runs?limit=0").status_code == 400
+    assert test_api_client.get("/refresh-runs?limit=abc").status_code == 400
+
+
+def test_get_refresh_runs_e2e(
+        test_db: SQLAlchemy,
+        test_http_server: HTTPServer,
+        test_api_client: FlaskClient
+):
+    # Register letter and trigger a refresh of all letters
+    shipment_id = str(uuid.uuid4())
+    prepare_mock_la_poste_api(test_http_server, shipment_id)
+    test_api_client.get(f"/letters/by_ship_id/{shipment_id}")
+    previous_runs = test_api_client.get("/refresh-runs?limit=1").json['refresh_runs']
+    previous_run_id = previous_runs[0]['id'] if previous_runs else 0
+    test_api_client.get("/letters/all")
+    # Wait until the refresh run is recorded as finished
+    refresh_run = __wait_for_finished_refresh_run(test_api_client, previous_run_id)
+    assert refresh_run is not None
+    assert refresh_run['letters_attempted'] >= 1
+
+
+def __wait_for_finished_refresh_run(test_api_client: FlaskClient, previous_run_id: int, timeout=3):
+    try_until = time.time() + timeout
+    while time.time() < try_until:
+        refresh_runs = test_api_client.get("/refresh-runs?limit=1").json['refresh_runs']
+        if refresh_runs and refresh_runs[0]['id'] > previous_run_id and refresh_runs[0]['finished']:
+            return refresh_runs[0]
+        time.sleep(0.1)
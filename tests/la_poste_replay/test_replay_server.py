@@ -0,0 +1,101 @@
+import json
+import uuid
+from threading import Thread
+
+import pytest
+import requests
+from flask_sqlalchemy import SQLAlchemy
+from pytest_httpserver import HTTPServer
+
+from app.la_poste_replay.replay_server import FaultInjection, ReplayServer
+from app.la_poste_replay.response_recorder import KEY_BODY, ResponseRecorder, load_recording
+from app.tracking_service.tracking_service import TrackingService
+from tests.test_fixtures import prepare_mock_la_poste_api
+
+
+def __start_replay_server(recording_path: str, **kwargs) -> ReplayServer:
+    # Listen to any free port (see server_port)
+    server = ReplayServer(("127.0.0.1", 0), load_recording(recording_path), **kwargs)
+    server.start_in_background()
+    return server
+
+
+@pytest.fixture()
+def recording_path(test_db: SQLAlchemy, test_app, httpserver: HTTPServer, tmp_path):
+    # Record the responses of the mock La Poste API for a few letters
+    path = str(tmp_path / "recording.jsonl")
+    test_app.config.update({"LA_POSTE_RECORD_PATH": path})
+    tracking_service = TrackingService()
+    shipment_statuses = {}
+    for _ in range(3):
+        shipment_id = str(uuid.uuid4())
+        shipment_statuses[shipment_id] = f"Letter status {uuid.uuid4()}"
+        prepare_mock_la_poste_api(httpserver, shipment_id, shipment_statuses[shipment_id])
+        tracking_service.track_letter(shipment_id)
+    test_app.config.update({"LA_POSTE_RECORD_PATH": None})
+    return path, shipment_statuses
+
+
+def test_record_and_replay(recording_path, test_app):
+    path, shipment_statuses = recording_path
+    assert set(load_recording(path)) == set(shipment_statuses)
+    server = __start_replay_server(path, speed=0)
+    try:
+        # Point the service to the replay server and track the recorded letters again
+        test_app.config.update({"LA_POSTE_API_BASE_URL": f"http://127.0.0.1:{server.server_port}/ssu/v1"})
+        tracking_service = TrackingService()
+        for shipment_id, status in shipment_statuses.items():
+            assert tracking_service.track_letter(shipment_id) == status
+        # Unknown letters are not found
+        response = requests.get(f"http://127.0.0.1:{server.server_port}/suivi-unifie/idship/{uuid.uuid4()}")
+        assert response.status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_replay_fault_injection(recording_path):
+    path, shipment_statuses = recording_path
+    server = __start_replay_server(path, speed=0, faults=FaultInjection(rate_429=1.0), cycle_unknown=True, seed=1)
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.server_port}/suivi-unifie/idship/{uuid.uuid4()}")
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+    finally:
+        server.shutdown()
+        server.server_close()
+    server = __start_replay_server(path, speed=0, cycle_unknown=True)
+    try:
+        # Unknown letters are answered with recorded responses of other letters
+        response = requests.get(f"http://127.0.0.1:{server.server_port}/suivi-unifie/idship/{uuid.uuid4()}")
+        assert response.status_code == 200
+        status = json.loads(response.text)['shipment']['event'][0]['label']
+        assert status in shipment_statuses.values()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fault_injection_rates():
+    with pytest.raises(ValueError):
+        FaultInjection(rate_429=0.6, rate_timeout=0.6)
+
+
+def test_concurrent_recorders_write_whole_lines(tmp_path):
+    # Every tracking service has its own recorder, therefore concurrent requests record through different recorders
+    path = str(tmp_path / "recording.jsonl")
+    body = json.dumps({"shipment": {"event": ["x" * 20000]}})
+
+    def record_responses(worker: int):
+        recorder = ResponseRecorder(path)
+        for index in range(20):
+            recorder.record(f"{worker}-{index}", 200, 0.01, "application/json", body)
+
+    workers = [Thread(target=record_responses, args=(worker,)) for worker in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    responses = load_recording(path)
+    assert len(responses) == 8 * 20
+    assert all(recorded[0][KEY_BODY] == body for recorded in responses.values())
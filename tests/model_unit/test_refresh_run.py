@@ -0,0 +1,30 @@
+import unittest
+
+from app.models.refresh_run import RefreshRun
+
+
+class RefreshRunUnitTest(unittest.TestCase):
+
+    def test_finish(self):
+        refresh_run = RefreshRun()
+        self.assertFalse(refresh_run.is_finished())
+        refresh_run.finish(attempted=10, changed=4, unchanged=5, failed=1,
+                           upstream_seconds=1.5, db_seconds=0.5, elapsed_seconds=2.0)
+        self.assertTrue(refresh_run.is_finished())
+        self.assertEqual(refresh_run.letters_attempted, 10)
+        self.assertEqual(refresh_run.letters_changed, 4)
+        self.assertEqual(refresh_run.letters_unchanged, 5)
+        self.assertEqual(refresh_run.letters_failed, 1)
+        self.assertEqual(refresh_run.letters_per_second, 5.0)
+        self.assertIsNone(refresh_run.error)
+
+    def test_finish_with_error(self):
+        refresh_run = RefreshRun()
+        refresh_run.finish(attempted=0, changed=0, unchanged=0, failed=0,
+                           upstream_seconds=0.0, db_seconds=0.0, elapsed_seconds=0.0, error="x" * 300)
+        self.assertIsNone(refresh_run.letters_per_second)
+        self.assertEqual(len(refresh_run.error), 191)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import uuid
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from pytest_httpserver import HTTPServer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.profiling.request_profiler import _before_cursor_execute, init_profiling
+from tests.test_fixtures import prepare_mock_la_poste_api
+
+
+def test_profiling_disabled(test_db: SQLAlchemy, httpserver: HTTPServer, test_app: Flask):
+    shipment_id = str(uuid.uuid4())
+    prepare_mock_la_poste_api(httpserver, shipment_id)
+    response = test_app.test_client().get(f"/letters/by_ship_id/{shipment_id}", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+def test_profiling_enabled(test_db: SQLAlchemy, httpserver: HTTPServer, test_app: Flask, tmp_path):
+    test_app.config.update({"PROFILING_ENABLED": True, "PROFILING_DIR": str(tmp_path)})
+    init_profiling(test_app)
+    test_client = test_app.test_client()
+    shipment_id = str(uuid.uuid4())
+    prepare_mock_la_poste_api(httpserver, shipment_id)
+    # Requests without the profiling header are not profiled (sampling is disabled by default)
+    response = test_client.get(f"/letters/by_ship_id/{shipment_id}")
+    assert "Server-Timing" not in response.headers
+    assert not os.listdir(tmp_path)
+    # Requests with the profiling header get a timing breakdown and a saved profile
+    response = test_client.get(f"/letters/by_ship_id/{shipment_id}", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    metrics = [metric.split(";")[0] for metric in response.headers["Server-Timing"].split(", ")]
+    assert metrics == ["upstream", "db", "serialisation", "total"]
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".prof")]) == 1
+    # Database timing listeners are only registered on the engine of the profiled application
+    assert event.contains(test_db.engine, "before_cursor_execute", _before_cursor_execute)
+    assert not event.contains(Engine, "before_cursor_execute", _before_cursor_execute)
@@ -8,13 +8,14 @@ from alembic import command
 from alembic.config import Config
 from pytest_httpserver import HTTPServer
 
-from app import app, db
+from app import create_app, db
 
 DEFAULT_TRACKING_STATUS_FOR_TESTING = 'THIS IS A DEFAULT TRACKING STATUS FOR TESTING'
 
 
 @pytest.fixture()
 def test_app():
+    app = create_app()
     app.config.update({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///../local_testing/testing.db",
@@ -37,15 +38,14 @@ def test_api_client(test_app):
 
 @pytest.fixture()
 def test_db(test_app):
-    # Run database migrations on testing database (prepare schema)
+    # Keep an application context for the whole test, so that services and models can be used directly
     with test_app.app_context():
-        config = Config(os.path.dirname(os.path.abspath(__file__)) + "/../migrations/alembic.ini")
-        config.set_main_option("script_location", os.path.dirname(os.path.abspath(__file__)) + "/../migrations")
-        command.upgrade(config, "head")
-    # Provide testing database
-    yield db
-    # Close connection after tests are finshed
-    db.session.close()
+        # Run database migrations on testing database (prepare schema)
+        upgrade_database()
+        # Provide testing database
+        yield db
+        # Close connection after tests are finshed
+        db.session.close()
 
 
 @pytest.fixture()
@@ -59,6 +59,13 @@ def test_http_server(httpserver: HTTPServer) -> HTTPServer:
     return httpserver
 
 
+def upgrade_database(revision: str = "head"):
+    # Run database migrations on the database of the current application
+    config = Config(os.path.dirname(os.path.abspath(__file__)) + "/../migrations/alembic.ini")
+    config.set_main_option("script_location", os.path.dirname(os.path.abspath(__file__)) + "/../migrations")
+    command.upgrade(config, revision)
+
+
 def prepare_mock_la_poste_api(httpserver: HTTPServer,
                               shipment_id: str,
                               latest_status: str = None,
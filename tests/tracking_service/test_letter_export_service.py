@@ -0,0 +1,50 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from threading import Thread
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import _enable_sqlite_wal
+from app.models.letter import Letter
+from app.tracking_service.letter_export_service import LetterExportService
+
+
+def test_export_letters_does_not_block_writers(test_db: SQLAlchemy, test_app: Flask):
+    test_app.config["SQLITE_WAL_ENABLED"] = True
+    # Write-ahead logging is enabled on the engine of the application only
+    assert event.contains(test_db.engine, "connect", _enable_sqlite_wal)
+    assert not event.contains(Engine, "connect", _enable_sqlite_wal)
+    # Register enough letters for the export to span several chunks, i.e. to keep its cursor open
+    # (as final letters, so that they are not tracked by refresh runs of other tests)
+    from_update = datetime.utcnow() - timedelta(seconds=1)
+    tracking_numbers = [str(uuid.uuid4()) for _ in range(3000)]
+    test_db.session.execute(Letter.__table__.insert(),
+                            [{'tracking_number': number, 'final': True} for number in tracking_numbers])
+    test_db.session.commit()
+    chunks = LetterExportService().export_letters(LetterExportService.FORMAT_JSONL,
+                                                  from_update=from_update, final=True)
+    exported = [next(chunks)]
+    # Register a letter from another thread (i.e. another connection) while the export is in progress
+    written_number = str(uuid.uuid4())
+    write_errors = []
+
+    def register_letter():
+        with test_app.app_context():
+            try:
+                test_db.session.add(Letter(tracking_number=written_number))
+                test_db.session.commit()
+            except Exception as e:
+                write_errors.append(e)
+
+    writer = Thread(target=register_letter)
+    writer.start()
+    writer.join()
+    assert not write_errors
+    # The export completes after the write
+    exported.extend(chunks)
+    exported_numbers = {json.loads(line)["tracking_number"] for line in b"".join(exported).decode("utf-8").splitlines()}
+    assert set(tracking_numbers) <= exported_numbers
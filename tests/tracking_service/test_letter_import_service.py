@@ -0,0 +1,53 @@
+import io
+import json
+import uuid
+
+from flask_sqlalchemy import SQLAlchemy
+
+from app.models.letter import Letter
+from app.tracking_service.letter_import_service import LetterImportService
+
+
+def test_import_letters_csv(test_db: SQLAlchemy):
+    # Register a letter beforehand, which should be detected as duplicate
+    registered_number = str(uuid.uuid4())
+    test_db.session.add(Letter(tracking_number=registered_number, status="Registered"))
+    test_db.session.commit()
+    new_numbers = [str(uuid.uuid4()) for _ in range(5)]
+    rows = ["tracking_number"] + new_numbers + [new_numbers[0], registered_number, "", "x" * 300]
+    source = io.StringIO("\n".join(rows) + "\n")
+    # Import in small chunks to exercise multiple transactions
+    report = LetterImportService(chunk_size=2).import_letters(source, LetterImportService.FORMAT_CSV)
+    assert report.inserted == len(new_numbers)
+    assert report.duplicates == 2
+    assert report.rejected_count == 1
+    assert report.rejected[0][1] == "Tracking number too long"
+    # New letters are registered as due for tracking, i.e. non-final
+    letters = test_db.session.query(Letter).filter(Letter.tracking_number.in_(new_numbers)).all()
+    assert len(letters) == len(new_numbers)
+    assert all(not letter.final and letter.status is None for letter in letters)
+    # The already registered letter is left untouched
+    assert test_db.session.query(Letter).filter_by(tracking_number=registered_number).one().status == "Registered"
+
+
+def test_import_letters_jsonl(test_db: SQLAlchemy):
+    first_number = str(uuid.uuid4())
+    second_number = str(uuid.uuid4())
+    lines = [json.dumps(first_number), json.dumps({"tracking_number": second_number}), "{not json", json.dumps({})]
+    report = LetterImportService().import_letters(io.StringIO("\n".join(lines)), LetterImportService.FORMAT_JSONL)
+    assert report.rows_read == 4
+    assert report.inserted == 2
+    assert [reason for _, reason in report.rejected] == ["Invalid JSON", "Missing tracking number"]
+    assert test_db.session.query(Letter).filter(Letter.tracking_number.in_([first_number, second_number])).count() == 2
+
+
+def test_import_letters_jsonl_numeric_tracking_numbers(test_db: SQLAlchemy):
+    first_number = uuid.uuid4().int % 10 ** 15
+    second_number = first_number + 1
+    lines = [json.dumps(first_number), json.dumps({"tracking_number": second_number}),
+             json.dumps({"tracking_number": 1.5}), json.dumps([str(first_number)]), json.dumps(True)]
+    report = LetterImportService().import_letters(io.StringIO("\n".join(lines)), LetterImportService.FORMAT_JSONL)
+    assert report.inserted == 2
+    assert [reason for _, reason in report.rejected] == ["Invalid tracking number type"] * 3
+    assert test_db.session.query(Letter) \
+        .filter(Letter.tracking_number.in_([str(first_number), str(second_number)])).count() == 2
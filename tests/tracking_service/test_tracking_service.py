@@ -1,8 +1,10 @@
+import socket
 import time
 import uuid
 from datetime import datetime, timedelta
 
 import pytest
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from pytest_httpserver import HTTPServer
 
@@ -10,7 +12,7 @@ import app
 from app.models.letter import Letter
 from app.models.status_update import StatusUpdate
 from app.tracking_service.tracking_service import TrackingService
-from tests.test_fixtures import prepare_mock_la_poste_api, DEFAULT_TRACKING_STATUS_FOR_TESTING
+from tests.test_fixtures import prepare_mock_la_poste_api, upgrade_database, DEFAULT_TRACKING_STATUS_FOR_TESTING
 
 
 def get_is_final():
@@ -64,7 +66,7 @@ def test_track_all_registered_letters(test_db: SQLAlchemy, httpserver: HTTPServe
     assert new_letter_status == letter_second_status
 
 
-def test_track_letters_updated_between(test_db: SQLAlchemy, httpserver: HTTPServer):
+def test_get_and_refresh_letters_updated_between(test_db: SQLAlchemy, httpserver: HTTPServer):
     # Setup mock server behaviour in response to La Poste API requests (use a mock server)
     # Register letter and update its status in the system
     shipment_id = str(uuid.uuid4())
@@ -83,16 +85,35 @@ def test_track_letters_updated_between(test_db: SQLAlchemy, httpserver: HTTPServ
     # because the update operation will begin after the service has been responded
     from_update1 = datetime.utcnow() - timedelta(hours=4)
     to_update1 = datetime.utcnow() + timedelta(minutes=10)
-    all_returned_statuses = test_tracking_service.track_letters_updated_between(from_update1, to_update1)
+    all_returned_statuses, _ = test_tracking_service.get_letters_updated_between(
+        from_update1, to_update1, limit=10, status=letter_first_status)
     assert shipment_id in all_returned_statuses
     assert all_returned_statuses[shipment_id] == letter_first_status
+    test_tracking_service.refresh_letters_updated_between(from_update1, to_update1)
     # Wait until the letter is updated in the database and check the updated status
     new_letter_status = __detect_status_change_in_database(shipment_id, letter_first_status)
     assert new_letter_status == letter_second_status
     # Check that the letter is not included in the results if out of the timestamp range specified
     from_update2 = datetime.utcnow() + timedelta(minutes=10)
     to_update2 = datetime.utcnow() + timedelta(minutes=20)
-    assert not test_tracking_service.track_letters_updated_between(from_update2, to_update2)
+    assert test_tracking_service.get_letters_updated_between(from_update2, to_update2, limit=1000) == ({}, None)
+
+
+def test_refresh_without_refresh_run_table(test_app: Flask, httpserver: HTTPServer, tmp_path):
+    # Use a database migrated up to the initial schema only, i.e. without the refresh run ledger
+    test_app.config.update({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'initial_schema.db'}"})
+    with test_app.app_context():
+        upgrade_database("6297642bcbc4")
+        shipment_id = str(uuid.uuid4())
+        prepare_mock_la_poste_api(httpserver, shipment_id)
+        test_tracking_service = TrackingService()
+        test_tracking_service.track_letter(shipment_id)
+        # The refresh goes on even though the run cannot be recorded
+        prepare_mock_la_poste_api(httpserver, shipment_id, DEFAULT_TRACKING_STATUS_FOR_TESTING)
+        test_tracking_service.track_all_registered_letters_in_database()
+        letter = Letter.query.filter(Letter.tracking_number == shipment_id).one()
+        assert letter.status == DEFAULT_TRACKING_STATUS_FOR_TESTING
+        app.db.session.close()
 
 
 def __detect_status_change_in_database(shipment_id: str, previous_status: str, timeout=3):
@@ -103,3 +124,42 @@ def __detect_status_change_in_database(shipment_id: str, previous_status: str, t
         if letter.status != previous_status:
             return letter.status
         time.sleep(0.1)
+
+
+def test_track_all_registered_letters_records_refresh_run(test_db: SQLAlchemy, httpserver: HTTPServer):
+    # Register a letter, so that there is at least one non-final letter to refresh
+    shipment_id = str(uuid.uuid4())
+    letter_first_status = f"Letter status {uuid.uuid4()}"
+    prepare_mock_la_poste_api(httpserver, shipment_id, letter_first_status)
+    test_tracking_service = TrackingService()
+    test_tracking_service.track_letter(shipment_id)
+    # Refresh all letters synchronously and check the recorded run
+    prepare_mock_la_poste_api(httpserver, shipment_id, DEFAULT_TRACKING_STATUS_FOR_TESTING)
+    test_tracking_service.track_all_registered_letters_in_database()
+    refresh_run = test_tracking_service.get_recent_refresh_runs(1)[0]
+    test_db.session.refresh(refresh_run)
+    assert refresh_run.is_finished()
+    assert refresh_run.from_update is None and refresh_run.to_update is None
+    assert refresh_run.letters_changed >= 1
+    assert refresh_run.letters_attempted == \
+        refresh_run.letters_changed + refresh_run.letters_unchanged + refresh_run.letters_failed
+    assert refresh_run.letters_per_second > 0
+
+
+def test_refresh_run_accounts_failed_upstream_calls(test_db: SQLAlchemy, test_app: Flask):
+    # Register a letter to refresh, and point the service to a port nobody listens to
+    letter = Letter(tracking_number=str(uuid.uuid4()))
+    test_db.session.add(letter)
+    test_db.session.commit()
+    test_db.session.refresh(letter)
+    with socket.socket() as unused_socket:
+        unused_socket.bind(("127.0.0.1", 0))
+        unused_port = unused_socket.getsockname()[1]
+    test_app.config["LA_POSTE_API_BASE_URL"] = f"http://127.0.0.1:{unused_port}"
+    test_tracking_service = TrackingService()
+    test_tracking_service.track_letters_in_range(letter.updated - timedelta(seconds=1),
+                                                 letter.updated + timedelta(seconds=1))
+    refresh_run = test_tracking_service.get_recent_refresh_runs(1)[0]
+    test_db.session.refresh(refresh_run)
+    assert refresh_run.letters_failed >= 1
+    assert refresh_run.upstream_seconds > 0
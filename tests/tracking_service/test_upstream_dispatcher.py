@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from app.tracking_service.tracking_service import TrackingService
+from app.tracking_service.upstream_dispatcher import (
+    BACKGROUND,
+    INTERACTIVE,
+    PriorityLimiter,
+    UpstreamDispatcher,
+    init_upstream_dispatcher
+)
+
+
+def test_background_never_uses_interactive_reserved_share():
+    limiter = PriorityLimiter(max_concurrency=3, interactive_reserved=1)
+    limiter.acquire(BACKGROUND)
+    limiter.acquire(BACKGROUND)
+    # A third background operation has to wait, while an interactive one can start immediately
+    third_background = threading.Thread(target=limiter.acquire, args=(BACKGROUND,), daemon=True)
+    third_background.start()
+    third_background.join(0.2)
+    assert third_background.is_alive()
+    limiter.acquire(INTERACTIVE)
+    assert limiter.in_flight(INTERACTIVE) == 1
+    # Background work is throttled back while interactive work is in flight
+    limiter.release(BACKGROUND)
+    third_background.join(0.2)
+    assert third_background.is_alive()
+    limiter.release(INTERACTIVE)
+    third_background.join(1)
+    assert not third_background.is_alive()
+    assert limiter.in_flight(BACKGROUND) == 2
+
+
+def test_interactive_goes_ahead_of_queued_background():
+    limiter = PriorityLimiter(max_concurrency=1)
+    started = []
+
+    def run(priority: int, name: str):
+        with limiter.slot(priority):
+            started.append(name)
+            time.sleep(0.05)
+
+    limiter.acquire(BACKGROUND)
+    threads = [threading.Thread(target=run, args=(BACKGROUND, f"background{i}")) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    interactive = threading.Thread(target=run, args=(INTERACTIVE, "interactive"))
+    interactive.start()
+    time.sleep(0.1)
+    limiter.release(BACKGROUND)
+    for thread in threads + [interactive]:
+        thread.join()
+    assert started[0] == "interactive"
+
+
+def test_background_leaves_reserved_quota_to_interactive():
+    limiter = PriorityLimiter(max_concurrency=2, rate_limit=10, interactive_reserved_quota=0.5)
+    # The bucket holds 15 tokens, of which 5 are reserved for interactive work
+    started = time.monotonic()
+    for _ in range(10):
+        with limiter.slot(BACKGROUND):
+            pass
+    for _ in range(5):
+        with limiter.slot(INTERACTIVE):
+            pass
+    assert time.monotonic() - started < 0.5
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        PriorityLimiter(max_concurrency=2, interactive_reserved=2)
+    with pytest.raises(ValueError):
+        PriorityLimiter(max_concurrency=2, interactive_reserved_quota=1.0)
+    # The configuration of an application is validated when the application is created
+    with pytest.raises(ValueError, match="UPSTREAM_INTERACTIVE_RESERVED=2"):
+        UpstreamDispatcher.from_config({"UPSTREAM_MAX_CONCURRENCY": 1, "UPSTREAM_INTERACTIVE_RESERVED": 2,
+                                        "UPSTREAM_INTERACTIVE_RESERVED_QUOTA": 0.2})
+
+
+def test_read_only_operations_do_not_need_dispatcher(test_db: SQLAlchemy, test_app: Flask):
+    test_app.config["UPSTREAM_MAX_CONCURRENCY"] = 1
+    with pytest.raises(ValueError):
+        init_upstream_dispatcher(test_app)
+    # Read-only operations never call the tracking API, therefore they do not use the dispatcher
+    test_app.extensions.pop("upstream_dispatcher", None)
+    test_tracking_service = TrackingService()
+    test_tracking_service.get_recent_refresh_runs(1)
+    test_tracking_service.get_letters_updated_between(datetime.utcnow(), datetime.utcnow(), limit=1)
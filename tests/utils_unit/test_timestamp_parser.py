@@ -0,0 +1,26 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.utils.timestamp_parser import parse_timestamp
+
+
+class TimestampParserUnitTest(unittest.TestCase):
+
+    def test_iso_format(self):
+        timestamp = datetime(2022, 5, 1, 23, 41, 27, 119735)
+        self.assertEqual(parse_timestamp(timestamp.isoformat()), timestamp)
+        self.assertEqual(parse_timestamp("2022-05-01T23:41:27+02:00"),
+                         datetime(2022, 5, 1, 23, 41, 27, tzinfo=timezone(timedelta(hours=2))))
+        self.assertEqual(parse_timestamp("2022-05-01T23:41:27Z"),
+                         datetime(2022, 5, 1, 23, 41, 27, tzinfo=timezone.utc))
+
+    def test_fallback_format(self):
+        self.assertEqual(parse_timestamp("1 May 2022 23:41"), datetime(2022, 5, 1, 23, 41))
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            parse_timestamp("invalid_timestamp")
+
+
+if __name__ == '__main__':
+    unittest.main()